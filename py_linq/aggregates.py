@@ -0,0 +1,129 @@
+"""
+Accumulators for streaming aggregation. An aggregate keeps a small running
+state instead of the elements it has seen. States of the same aggregate can be
+merged, so partial aggregates over partitions combine into the aggregate of
+the whole collection.
+"""
+
+from .core import selector
+from .exceptions import NoElementsError
+
+_EMPTY = object()
+
+
+class Aggregate(object):
+    """
+    Base class for aggregates. Subclasses implement initial, step, merge and
+    result
+    """
+
+    def __init__(self, func=lambda x: x):
+        """
+        Constructor
+        :param func: lambda expression or key path to transform data before
+        aggregating
+        """
+        self.func = selector(func)
+
+    def initial(self):
+        """
+        :return: the state of an aggregate that has seen no elements
+        """
+        raise NotImplementedError()
+
+    def step(self, state, element):
+        """
+        :return: the state after adding element
+        """
+        raise NotImplementedError()
+
+    def merge(self, state, other):
+        """
+        :return: the state of both states combined
+        """
+        raise NotImplementedError()
+
+    def result(self, state):
+        """
+        :return: the value of the aggregate
+        """
+        return state
+
+
+class Count(Aggregate):
+    def __init__(self, predicate=None):
+        """
+        Constructor
+        :param predicate: only count elements matching the predicate. None to
+        count all elements
+        """
+        super(Count, self).__init__()
+        self.predicate = predicate
+
+    def initial(self):
+        return 0
+
+    def step(self, state, element):
+        if self.predicate is None or self.predicate(element):
+            return state + 1
+        return state
+
+    def merge(self, state, other):
+        return state + other
+
+
+class Sum(Aggregate):
+    def initial(self):
+        return 0
+
+    def step(self, state, element):
+        return state + self.func(element)
+
+    def merge(self, state, other):
+        return state + other
+
+
+class Min(Aggregate):
+    def initial(self):
+        return _EMPTY
+
+    def step(self, state, element):
+        value = self.func(element)
+        return value if state is _EMPTY or value < state else state
+
+    def merge(self, state, other):
+        if state is _EMPTY:
+            return other
+        return state if other is _EMPTY or state <= other else other
+
+    def result(self, state):
+        if state is _EMPTY:
+            raise NoElementsError(u"Iterable contains no elements")
+        return state
+
+
+class Max(Min):
+    def step(self, state, element):
+        value = self.func(element)
+        return value if state is _EMPTY or value > state else state
+
+    def merge(self, state, other):
+        if state is _EMPTY:
+            return other
+        return state if other is _EMPTY or state >= other else other
+
+
+class Avg(Aggregate):
+    def initial(self):
+        return (0, 0)
+
+    def step(self, state, element):
+        return (state[0] + self.func(element), state[1] + 1)
+
+    def merge(self, state, other):
+        return (state[0] + other[0], state[1] + other[1])
+
+    def result(self, state):
+        if state[1] == 0:
+            raise NoElementsError(u"Iterable contains no elements")
+        return float(state[0]) / float(state[1])
@@ -0,0 +1,144 @@
+"""
+Compiles a linear chain of streaming operators into a single generated
+generator function, so each element passes through one loop instead of one
+generator frame per operator.
+"""
+
+_functions = {}
+
+
+def stage_kind(enumerable, stages):
+    """
+    :param enumerable: an Enumerable instance
+    :param stages: dict of Enumerable class to (stage kind, attribute name)
+    :return: (kind, argument) of the stage or None if enumerable is not a
+    streaming stage
+    """
+    stage = stages.get(type(enumerable))
+    if stage is None:
+        return None
+    kind, attr = stage
+    return kind, getattr(enumerable, attr)
+
+
+def plan(enumerable, stages):
+    """
+    Walks a chain of streaming stages back to its source
+    :param enumerable: the last Enumerable of the chain
+    :param stages: dict of Enumerable class to (stage kind, attribute name)
+    :return: (source, list of (kind, argument) tuples from first to last)
+    """
+    steps = []
+    node = enumerable
+    step = stage_kind(node, stages)
+    while step is not None:
+        steps.append(step)
+        node = node.data
+        step = stage_kind(node, stages)
+    steps.reverse()
+    return node, steps
+
+
+class _Writer(object):
+    def __init__(self):
+        self.lines = []
+        self.indent = 1
+        # number of nested loops around the current line
+        self.level = 0
+        # (counter, level of the loop in which the take counts elements)
+        self.takes = []
+
+    def emit(self, line):
+        self.lines.append("    " * self.indent + line)
+
+    def exit_check(self, level):
+        # a take that is used up ends the pipeline before its loop reads
+        # another element. Elements produced by loops nested inside it from
+        # the last taken element are not affected
+        takes = [t for t, take_level in self.takes if take_level == level]
+        if takes:
+            self.emit("if {0}: return".format(" or ".join(t + " <= 0" for t in takes)))
+
+    def emit_continue(self):
+        self.exit_check(self.level)
+        self.emit("continue")
+
+
+def _generate(shape):
+    w = _Writer()
+    params = ", ".join("a{0}".format(i) for i in range(len(shape)))
+    for i, kind in enumerate(shape):
+        if kind == "skip":
+            w.emit("k{0} = a{0}".format(i))
+        elif kind == "take":
+            w.emit("t{0} = a{0}".format(i))
+            w.emit("if t{0} <= 0: return".format(i))
+        elif kind == "skip_while":
+            w.emit("w{0} = True".format(i))
+    w.emit("for x in source:")
+    w.indent += 1
+    w.level += 1
+    loops = [w.indent]
+    for i, kind in enumerate(shape):
+        if kind == "select":
+            w.emit("x = a{0}(x)".format(i))
+        elif kind == "where":
+            w.emit("if not a{0}(x):".format(i))
+            w.indent += 1
+            w.emit_continue()
+            w.indent -= 1
+        elif kind == "select_many":
+            w.emit("for x in a{0}(x):".format(i))
+            w.indent += 1
+            w.level += 1
+            loops.append(w.indent)
+        elif kind == "skip":
+            w.emit("if k{0} > 0:".format(i))
+            w.indent += 1
+            w.emit("k{0} -= 1".format(i))
+            w.emit_continue()
+            w.indent -= 1
+        elif kind == "take":
+            w.emit("t{0} -= 1".format(i))
+            w.takes.append(("t{0}".format(i), w.level))
+        elif kind == "skip_while":
+            w.emit("if w{0}:".format(i))
+            w.indent += 1
+            w.emit("if a{0}(x):".format(i))
+            w.indent += 1
+            w.emit_continue()
+            w.indent -= 1
+            w.emit("w{0} = False".format(i))
+            w.indent -= 1
+        elif kind == "take_while":
+            w.emit("if not a{0}(x): return".format(i))
+        else:
+            raise ValueError(u"Unknown stage {0}".format(kind))
+    w.emit("yield x")
+    w.exit_check(w.level)
+    for level in range(len(loops) - 1, 0, -1):
+        w.indent = loops[level] - 1
+        w.level = level
+        w.exit_check(level)
+    source = "def pipeline(source{0}):\n{1}\n".format(
+        ", " + params if params else "", "\n".join(w.lines)
+    )
+    namespace = {}
+    exec(compile(source, "<py_linq pipeline {0}>".format(shape), "exec"), namespace)
+    pipeline = namespace["pipeline"]
+    pipeline.source = source
+    return pipeline
+
+
+def pipeline_function(shape):
+    """
+    Gets the generated generator function for a plan shape. Functions are
+    generated once per shape and cached
+    :param shape: tuple of stage kinds
+    :return: generator function taking the source followed by one argument
+    per stage
+    """
+    function = _functions.get(shape)
+    if function is None:
+        function = _functions[shape] = _generate(shape)
+    return function
@@ -1,20 +1,146 @@
+import importlib
+import itertools
+from operator import attrgetter, itemgetter
+
+
+class LazyModule(object):
+    """
+    Stand-in for a module that is imported the first time one of its
+    attributes is accessed. Accessed attributes are cached on the stand-in so
+    later lookups cost the same as on the module itself
+    """
+
+    def __init__(self, name):
+        """
+        Constructor
+        :param name: absolute name of the module
+        """
+        self._name = name
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        value = getattr(importlib.import_module(self._name), attr)
+        setattr(self, attr, value)
+        return value
+
+
+hashlib = LazyModule("hashlib")
+json = LazyModule("json")
+
+_key_classes = {}
+
+
+def key_class(key_names):
+    """
+    Gets the Key subclass for the given key names. Instances of the class
+    store their values in __slots__ instead of a per-instance __dict__, unless
+    a name is not an identifier or is also an attribute of Key, such as
+    _fields. Classes are created once and reused for the same key names
+    :param key_names: iterable of key names
+    :return: Key subclass
+    """
+    key_names = tuple(key_names)
+    cls = _key_classes.get(key_names)
+    if cls is None:
+        namespace = {"_fields": key_names}
+        if all(
+            n.isidentifier() and not n.startswith("__") and not hasattr(Key, n)
+            for n in key_names
+        ):
+            namespace["__slots__"] = key_names
+        cls = _key_classes[key_names] = type("Key", (Key,), namespace)
+    return cls
+
+
 class Key(object):
-    def __init__(self, key, **kwargs):
+    __slots__ = ()
+    _fields = ()
+
+    def __new__(cls, key=None, **kwargs):
         """
         Constructor for Key class. Autogenerates key properties in object
         given dict or kwargs
         :param key: dict of name-values
         :param kwargs: optional keyword arguments
-        :return: void
+        :return: instance of the Key subclass for the names of key
         """
         key = key if key is not None else kwargs
-        self.__dict__.update(key)
+        if cls is Key:
+            cls = key_class(key)
+        return cls._make(key[name] for name in cls._fields)
+
+    def __init__(self, key=None, **kwargs):
+        pass
+
+    @classmethod
+    def _make(cls, values):
+        """
+        Creates a key from values in the order of the key names
+        :param values: iterable of values
+        :return: Key instance
+        """
+        instance = object.__new__(cls)
+        # __dictoffset__ is 0 for classes whose instances have no __dict__
+        if cls.__dictoffset__:
+            instance.__dict__.update(zip(cls._fields, values))
+            return instance
+        for name, value in zip(cls._fields, values):
+            setattr(instance, name, value)
+        return instance
+
+    # key names may shadow the methods and _fields on an instance, so the
+    # methods below look them up on the class
+
+    def _values(self):
+        cls = type(self)
+        if cls.__dictoffset__:
+            return tuple(self.__dict__[name] for name in cls._fields)
+        return tuple(getattr(self, name) for name in cls._fields)
+
+    def _asdict(self):
+        return dict(zip(type(self)._fields, Key._values(self)))
+
+    def __eq__(self, other):
+        if not isinstance(other, Key) or type(self)._fields != type(other)._fields:
+            return False
+        return Key._values(self) == Key._values(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(Key._values(self))
+
+    def __reduce__(self):
+        return Key, (Key._asdict(self),)
 
     def __repr__(self):
-        return self.__dict__.__repr__()
+        return Key._asdict(self).__repr__()
+
+
+def identity(x):
+    """
+    Default key selector. Operators recognize it when matching the key of a
+    sorted enumerable
+    """
+    return x
+
+
+def same_key(key1, key2):
+    """
+    :return: True if both key selectors are known to select the same key
+    """
+    if key1 is key2:
+        return True
+    if not isinstance(key1, KeyPath) or not isinstance(key2, KeyPath):
+        return False
+    return key1.path == key2.path
 
 
 class OrderingDirection(object):
+    __slots__ = ("key", "descending")
+
     def __init__(self, key, reverse):
         """
         A container to hold the lambda key and sorting direction
@@ -23,3 +149,208 @@ class OrderingDirection(object):
         """
         self.key = key
         self.descending = reverse
+
+
+_encoder = []
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(value):
+    # splitmix64 finalizer: a bijection of 64 bit integers whose output bits
+    # each depend on all input bits
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+def _digest64(data):
+    return int.from_bytes(hashlib.md5(data).digest()[:8], "big")
+
+
+def stable_hash(value):
+    """
+    Computes a 64 bit hash of a value that is the same across processes and
+    interpreter runs, unlike the builtin hash which is salted for strings.
+    Integers, strings and bytes are hashed directly, other values by their
+    JSON serialization
+    :param value: a json serializable value (other objects are hashed by repr)
+    :return: integer in [0, 2 ** 64)
+    """
+    kind = type(value)
+    if kind is int and -(1 << 63) <= value < 1 << 63:
+        return _mix64(value & _MASK64)
+    if kind is str:
+        return _digest64(value.encode("utf-8", "surrogatepass"))
+    if kind is bytes:
+        return _digest64(value)
+    if not _encoder:
+        _encoder.append(json.JSONEncoder(sort_keys=True, default=repr))
+    return _digest64(_encoder[0].encode(value).encode("utf-8"))
+
+
+def _is_mapping(value):
+    return isinstance(value, dict) or (
+        hasattr(value, "keys") and hasattr(value, "__getitem__")
+    )
+
+
+def _lookup(value, segment):
+    """
+    :return: (getter class, argument) of a path segment on value
+    """
+    is_index = segment.lstrip("-").isdigit()
+    if _is_mapping(value):
+        if is_index and segment not in value:
+            return itemgetter, int(segment)
+        return itemgetter, segment
+    if is_index and hasattr(value, "__getitem__"):
+        return itemgetter, int(segment)
+    return attrgetter, segment
+
+
+def _chain(getters):
+    if len(getters) == 1:
+        return getters[0]
+
+    def get(element):
+        for getter in getters:
+            element = getter(element)
+        return element
+
+    return get
+
+
+def _compile_path(lookups):
+    if all(kind is attrgetter for kind, arg in lookups):
+        return attrgetter(".".join(arg for kind, arg in lookups))
+    return _chain([kind(arg) for kind, arg in lookups])
+
+
+class KeyPath(object):
+    """
+    Key selector given as a dotted path such as "id", "user.name" or
+    "items.0", or as a tuple of paths. Each segment is an item lookup on
+    mappings, an index when it is an integer on sequences and an attribute
+    lookup otherwise. The lookups are resolved against the first element and
+    compiled to operator.itemgetter/attrgetter, so all elements are expected
+    to have the same shape
+    """
+
+    __slots__ = ("path", "paths", "_getter")
+
+    def __init__(self, path):
+        """
+        Constructor
+        :param path: dotted path string or tuple of dotted path strings. A
+        tuple selects a tuple of values
+        """
+        self.path = path
+        paths = path if isinstance(path, tuple) else (path,)
+        self.paths = tuple(tuple(p.split(".")) for p in paths)
+        self._getter = None
+
+    def resolve(self, element):
+        """
+        Compiles the path for elements shaped like element
+        :param element: a sample element
+        :return: callable returning the key of an element
+        """
+        if self._getter is None:
+            self._getter = self._compile(element)
+        return self._getter
+
+    def _compile(self, element):
+        paths = []
+        for segments in self.paths:
+            value = element
+            lookups = []
+            for segment in segments:
+                kind, arg = _lookup(value, segment)
+                lookups.append((kind, arg))
+                value = kind(arg)(value)
+            paths.append(lookups)
+        if not isinstance(self.path, tuple):
+            return _compile_path(paths[0])
+        if len(paths) > 1 and all(len(p) == 1 for p in paths):
+            kinds = set(p[0][0] for p in paths)
+            if len(kinds) == 1:
+                return kinds.pop()(*(p[0][1] for p in paths))
+        getters = [_compile_path(p) for p in paths]
+        return lambda element: tuple(getter(element) for getter in getters)
+
+    def __call__(self, element):
+        getter = self._getter
+        if getter is None:
+            getter = self.resolve(element)
+        return getter(element)
+
+    def __reduce__(self):
+        return KeyPath, (self.path,)
+
+    def __repr__(self):
+        return "KeyPath({0!r})".format(self.path)
+
+
+def selector(key):
+    """
+    Converts a key path or a tuple of key paths to a KeyPath. Callables and
+    None are returned as they are
+    :param key: lambda expression, dotted path string or tuple of paths
+    :return: callable or None
+    """
+    if key is None or callable(key):
+        return key
+    if isinstance(key, str) or (
+        isinstance(key, tuple) and key and all(isinstance(p, str) for p in key)
+    ):
+        return KeyPath(key)
+    raise TypeError(
+        u"key must be a lambda expression, a key path or a tuple of key paths"
+    )
+
+
+def resolve(key, element):
+    """
+    :param key: key selector
+    :param element: a sample element
+    :return: the compiled getter if key is a KeyPath, otherwise key
+    """
+    if isinstance(key, KeyPath):
+        return key.resolve(element)
+    return key
+
+
+def resolve_first(key, iterable):
+    """
+    Resolves a key selector against the first element of an iterable, so
+    that loops over the elements call the compiled getter of a KeyPath
+    directly
+    :param key: key selector
+    :param iterable: the elements the key is applied to
+    :return: (key selector, iterator of all elements)
+    """
+    iterator = iter(iterable)
+    if not isinstance(key, KeyPath):
+        return key, iterator
+    for first in iterator:
+        return key.resolve(first), itertools.chain((first,), iterator)
+    return key, iterator
+
+
+def key_map(key, iterable):
+    """
+    map(key, iterable) that calls the compiled getter of a KeyPath directly
+    """
+    if isinstance(key, KeyPath):
+        return _key_path_map(key, iterable)
+    return map(key, iterable)
+
+
+def _key_path_map(key, iterable):
+    iterator = iter(iterable)
+    for first in iterator:
+        getter = key.resolve(first)
+        yield getter(first)
+        for value in map(getter, iterator):
+            yield value
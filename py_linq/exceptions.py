@@ -12,3 +12,11 @@ class NoMatchingElement(Exception):
 
 class MoreThanOneMatchingElement(Exception):
     pass
+
+
+class KeyLimitExceeded(Exception):
+    pass
+
+
+class MemoryLimitExceeded(Exception):
+    pass
@@ -0,0 +1,243 @@
+"""
+Out-of-core algorithms for Enumerable. Data that does not fit in the given
+memory budget is spilled to temporary files that are removed when iteration
+completes, fails or is abandoned.
+"""
+
+import heapq
+import itertools
+import pickle
+import tempfile
+
+from .core import resolve
+
+SPILL_BATCH_SIZE = 1024
+
+
+class SpillFile(object):
+    """
+    Temporary file holding a sequence of pickled elements
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._batch = []
+        self.count = 0
+
+    def write(self, element):
+        self._batch.append(element)
+        self.count += 1
+        if len(self._batch) >= SPILL_BATCH_SIZE:
+            self._flush()
+
+    def write_all(self, elements):
+        for element in elements:
+            self.write(element)
+
+    def _flush(self):
+        if self._batch:
+            pickle.dump(self._batch, self._file, pickle.HIGHEST_PROTOCOL)
+            self._batch = []
+
+    def flush(self):
+        """
+        Writes buffered elements through to the file, so that they can be read
+        through another handle of it such as in a forked process
+        """
+        self._flush()
+        self._file.flush()
+
+    def __iter__(self):
+        self._flush()
+        self._file.seek(0)
+        while True:
+            try:
+                batch = pickle.load(self._file)
+            except EOFError:
+                return
+            for element in batch:
+                yield element
+
+    def close(self):
+        self._batch = []
+        self._file.close()
+
+
+class _OrderKey(object):
+    """
+    Composite sort key for a list of OrderingDirection instances
+    """
+
+    __slots__ = ("values", "directions")
+
+    def __init__(self, values, directions):
+        self.values = values
+        self.directions = directions
+
+    def __lt__(self, other):
+        for a, b, descending in zip(self.values, other.values, self.directions):
+            if a < b:
+                return not descending
+            if b < a:
+                return descending
+        return False
+
+    def __eq__(self, other):
+        # heapq compares [key, order, ...] lists, which checks equality first
+        return not (self < other or other < self)
+
+
+def sort_in_memory(data, key_funcs):
+    """
+    Stable sort of a list in place using a list of OrderingDirection instances
+    in order of primary key --> less important keys
+    """
+    for o in reversed(key_funcs):
+        key = resolve(o.key, data[0]) if data else o.key
+        data.sort(key=key, reverse=o.descending)
+    return data
+
+
+def external_sort(iterable, key_funcs, max_in_memory):
+    """
+    Stable external merge sort. Sorted runs of at most max_in_memory elements
+    are written to temporary files and lazily merged with a k-way heap merge.
+    The result is identical to sort_in_memory
+    :param iterable: the elements to sort. Elements must be picklable if the
+    data does not fit in memory
+    :param key_funcs: list of OrderingDirection instances
+    :param max_in_memory: maximum number of elements held in memory
+    :return: generator of sorted elements
+    """
+    runs = []
+    try:
+        iterator = iter(iterable)
+        while True:
+            chunk = list(itertools.islice(iterator, max_in_memory))
+            if not chunk:
+                break
+            sort_in_memory(chunk, key_funcs)
+            if not runs and len(chunk) < max_in_memory:
+                for element in chunk:
+                    yield element
+                return
+            run = SpillFile()
+            runs.append(run)
+            run.write_all(chunk)
+            chunk = None
+        keys = [o.key for o in key_funcs]
+        directions = [o.descending for o in key_funcs]
+        for element in heapq.merge(
+            *runs, key=lambda e: _OrderKey([k(e) for k in keys], directions)
+        ):
+            yield element
+    finally:
+        for run in runs:
+            run.close()
+
+
+PARTITIONS = 32
+MAX_PARTITION_DEPTH = 3
+
+
+def _partition(elements, key_hash, depth, fanout):
+    parts = [SpillFile() for i in range(fanout)]
+    try:
+        for element in elements:
+            parts[hash((depth, key_hash(element))) % fanout].write(element)
+    except BaseException:
+        for part in parts:
+            part.close()
+        raise
+    return parts
+
+
+def partition_by_key(iterable, key_hash, max_in_memory, fanout=PARTITIONS, depth=0):
+    """
+    Splits elements into lists of at most max_in_memory elements so that all
+    elements with the same key hash are in the same list. If all elements fit,
+    a single list in the original order is returned. Otherwise elements are
+    hash partitioned to temporary files, recursively if a partition is still
+    too large. A single key with more than max_in_memory elements cannot be
+    split and is returned whole
+    :param iterable: the elements to partition. Elements must be picklable if
+    the data does not fit in memory
+    :param key_hash: lambda expression returning an integer hash of the key
+    :param max_in_memory: maximum number of elements held in memory
+    :param fanout: number of partitions to split into at each level
+    :return: generator of lists of elements
+    """
+    iterator = iter(iterable)
+    buffered = list(itertools.islice(iterator, max_in_memory + 1))
+    if len(buffered) <= max_in_memory or depth >= MAX_PARTITION_DEPTH:
+        buffered.extend(iterator)
+        yield buffered
+        return
+    parts = _partition(itertools.chain(buffered, iterator), key_hash, depth, fanout)
+    buffered = None
+    try:
+        for part in parts:
+            for rows in partition_by_key(
+                part, key_hash, max_in_memory, fanout, depth + 1
+            ):
+                yield rows
+            part.close()
+    finally:
+        for part in parts:
+            part.close()
+
+
+def partition_pairs(
+    outer,
+    outer_hash,
+    inner,
+    inner_hash,
+    max_in_memory,
+    fanout=PARTITIONS,
+    depth=0,
+):
+    """
+    Grace hash partitioning of the two sides of a join. Returns pairs of
+    (outer iterable, inner list) where the inner list has at most
+    max_in_memory elements and every outer element is paired with all inner
+    elements that have the same key hash. If the inner side fits in memory, a
+    single pair with the unpartitioned outer iterable is returned
+    :param outer: the probe side of the join, streamed
+    :param outer_hash: lambda expression returning an integer hash of the
+    outer key
+    :param inner: the build side of the join
+    :param inner_hash: lambda expression returning an integer hash of the
+    inner key
+    :param max_in_memory: maximum number of inner elements held in memory
+    :param fanout: number of partitions to split into at each level
+    :return: generator of (iterable, list) tuples
+    """
+    inner_iterator = iter(inner)
+    buffered = list(itertools.islice(inner_iterator, max_in_memory + 1))
+    if len(buffered) <= max_in_memory or depth >= MAX_PARTITION_DEPTH:
+        buffered.extend(inner_iterator)
+        yield outer, buffered
+        return
+    inner_parts = _partition(
+        itertools.chain(buffered, inner_iterator), inner_hash, depth, fanout
+    )
+    buffered = None
+    outer_parts = []
+    try:
+        outer_parts = _partition(outer, outer_hash, depth, fanout)
+        for outer_part, inner_part in zip(outer_parts, inner_parts):
+            for pair in partition_pairs(
+                outer_part,
+                outer_hash,
+                inner_part,
+                inner_hash,
+                max_in_memory,
+                fanout,
+                depth + 1,
+            ):
+                yield pair
+            outer_part.close()
+            inner_part.close()
+    finally:
+        for part in outer_parts + inner_parts:
+            part.close()
@@ -0,0 +1,227 @@
+"""
+Lazy file sources and streaming file sinks for Enumerable. Every iteration of a
+source reopens the file, so a query over a file can be iterated many times
+without holding the file in memory. Sinks write in buffered batches so memory
+stays constant however large the output is.
+"""
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+from collections import namedtuple
+from operator import itemgetter
+
+BUFFER_SIZE = 1 << 20
+
+_MAGIC = [
+    (b"\x1f\x8b", gzip.open),
+    (b"BZh", bz2.open),
+    (b"\xfd7zXZ\x00", lzma.open),
+]
+
+_COMPRESSION = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+WriteResult = namedtuple("WriteResult", ["count", "bytes"])
+
+_END = object()
+
+
+def _fspath(path):
+    # os.fspath and path-like support in io.open are new in Python 3.6
+    if isinstance(path, (str, bytes)):
+        return path
+    fspath = getattr(path, "__fspath__", None)
+    return fspath() if fspath is not None else str(path)
+
+
+def open_text(path, encoding="utf-8", newline=None, buffer_size=BUFFER_SIZE):
+    """
+    Opens a text file for reading, transparently decompressing gzip, bz2 and
+    xz files as a stream. The compression is detected from the file contents
+    :param path: path to the file
+    :param encoding: text encoding of the file
+    :param newline: newline mode passed to io.TextIOWrapper
+    :param buffer_size: size of the read buffer in bytes
+    :return: text file object
+    """
+    path = _fspath(path)
+    with io.open(path, "rb") as f:
+        magic = f.read(6)
+    for prefix, opener in _MAGIC:
+        if magic.startswith(prefix):
+            raw = opener(path, "rb")
+            return io.TextIOWrapper(
+                io.BufferedReader(raw, buffer_size), encoding=encoding, newline=newline
+            )
+    return io.open(path, "r", buffering=buffer_size, encoding=encoding, newline=newline)
+
+
+class FileSource(object):
+    """
+    Re-iterable source that opens a file and parses it each time it is
+    iterated
+    """
+
+    def __init__(self, path, parse, encoding="utf-8", newline=None):
+        """
+        Constructor
+        :param path: path to the file
+        :param parse: function that takes a text file object and returns an
+        iterable of parsed elements
+        :param encoding: text encoding of the file
+        :param newline: newline mode passed to io.TextIOWrapper
+        """
+        self.path = path
+        self.parse = parse
+        self.encoding = encoding
+        self.newline = newline
+
+    def __iter__(self):
+        with open_text(self.path, self.encoding, self.newline) as f:
+            for element in self.parse(f):
+                yield element
+
+
+def parse_lines(keep_newlines):
+    def parse(f):
+        if keep_newlines:
+            return f
+        return (line.rstrip("\r\n") for line in f)
+
+    return parse
+
+
+def parse_csv(columns, header, **fmtparams):
+    def parse(f):
+        reader = csv.reader(f, **fmtparams)
+        if not header:
+            if columns is None:
+                return reader
+            getter = itemgetter(*columns)
+            if len(columns) == 1:
+                return ([getter(row)] for row in reader)
+            return (list(getter(row)) for row in reader)
+        names = next(reader, None)
+        if names is None:
+            return iter([])
+        selected = names if columns is None else list(columns)
+        missing = [c for c in selected if c not in names]
+        if missing:
+            raise KeyError(u"Columns not found in header: {0}".format(missing))
+        indexes = [names.index(c) for c in selected]
+        if not indexes:
+            return ({} for row in reader)
+        getter = itemgetter(*indexes)
+        if len(indexes) == 1:
+            return ({selected[0]: getter(row)} for row in reader)
+        return (dict(zip(selected, getter(row))) for row in reader)
+
+    return parse
+
+
+def parse_jsonl(f):
+    loads = json.loads
+    for line in f:
+        if line.strip():
+            yield loads(line)
+
+
+def open_binary_writer(path, compression="infer", buffer_size=BUFFER_SIZE):
+    """
+    Opens a file for writing bytes, optionally compressing the stream
+    :param path: path to the file
+    :param compression: "gzip", "bz2", "xz", None for no compression or
+    "infer" to choose from the file extension
+    :param buffer_size: size of the write buffer in bytes
+    :return: binary file object
+    """
+    path = _fspath(path)
+    if compression == "infer":
+        compression = next(
+            (c for ext, c in _EXTENSIONS.items() if path.endswith(ext)), None
+        )
+    if compression is None:
+        return io.open(path, "wb", buffering=buffer_size)
+    if compression not in _COMPRESSION:
+        raise ValueError(u"Unknown compression {0}".format(compression))
+    return io.BufferedWriter(_COMPRESSION[compression](path, "wb"), buffer_size)
+
+
+def write_chunks(fileobj, chunks, encoding="utf-8"):
+    """
+    Writes chunks of serialized elements to a file object
+    :param fileobj: text or binary file object
+    :param chunks: iterable of (number of elements, str or bytes) tuples
+    :param encoding: encoding used for str chunks written to binary files
+    :return: WriteResult of the number of elements and bytes written
+    """
+    is_text = isinstance(fileobj, io.TextIOBase)
+    text_encoding = getattr(fileobj, "encoding", None) or encoding
+    count = 0
+    written = 0
+    for n, data in chunks:
+        if is_text:
+            written += len(data.encode(text_encoding))
+        else:
+            if not isinstance(data, bytes):
+                data = data.encode(encoding)
+            written += len(data)
+        fileobj.write(data)
+        count += n
+    return WriteResult(count, written)
+
+
+def serialized_chunks(elements, serializer, batch_size):
+    batch = []
+    for element in elements:
+        batch.append(serializer(element))
+        if len(batch) >= batch_size:
+            yield len(batch), _join(batch)
+            batch = []
+    if batch:
+        yield len(batch), _join(batch)
+
+
+def _join(batch):
+    return (b"" if isinstance(batch[0], bytes) else u"").join(batch)
+
+
+def jsonl_serializer(element):
+    return json.dumps(element) + u"\n"
+
+
+def csv_chunks(elements, columns, header, batch_size, **fmtparams):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, **fmtparams)
+    iterator = iter(elements)
+    first = next(iterator, _END)
+    if first is _END:
+        if header and columns is not None:
+            writer.writerow(columns)
+            yield 0, buffer.getvalue()
+        return
+    if columns is None and isinstance(first, dict):
+        columns = list(first)
+    if header and columns is not None:
+        writer.writerow(columns)
+
+    def row(element):
+        if isinstance(element, dict):
+            return [element.get(c, u"") for c in columns]
+        return element
+
+    batch = [row(first)]
+    for element in iterator:
+        batch.append(row(element))
+        if len(batch) >= batch_size:
+            writer.writerows(batch)
+            yield len(batch), buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            batch = []
+    if batch:
+        writer.writerows(batch)
+        yield len(batch), buffer.getvalue()
@@ -0,0 +1,205 @@
+"""
+Memory accounting for Enumerable queries. Operators that buffer elements, such
+as sorting, grouping, set operations and hash joins, report the size of their
+buffers to the active MemoryProfile. Bytes are estimated from the sizes of a
+sample of the buffered elements, so the report is approximate.
+"""
+
+import sys
+from _thread import get_ident
+from collections import namedtuple
+
+from .exceptions import MemoryLimitExceeded
+
+# elements whose size is measured before sampling every SAMPLE_INTERVAL-th
+SAMPLE_START = 16
+SAMPLE_INTERVAL = 256
+# bytes per element of the list, dict or set entry referencing it
+ENTRY_SIZE = 32
+
+OperatorMemory = namedtuple(
+    "OperatorMemory", ["operator", "peak_elements", "peak_bytes"]
+)
+
+# stacks of active profiles by thread, so that queries of other threads are
+# not charged to a profile
+_profiles = {}
+
+
+def active_profile():
+    """
+    :return: the innermost active MemoryProfile of the current thread or None
+    if memory is not being profiled
+    """
+    stack = _profiles.get(get_ident())
+    return stack[-1] if stack else None
+
+
+def element_size(element):
+    """
+    Approximate number of bytes retained by an element, counting the element
+    and the values it directly contains
+    :param element: any object
+    :return: size in bytes
+    """
+    size = sys.getsizeof(element)
+    if isinstance(element, dict):
+        values = element.values()
+    elif isinstance(element, (list, tuple, set, frozenset)):
+        values = element
+    else:
+        return size
+    return size + sum(sys.getsizeof(v) for v in values)
+
+
+class _Buffer(object):
+    __slots__ = ("name", "elements", "peak_elements", "bytes", "samples", "sampled")
+
+    def __init__(self, name):
+        self.name = name
+        self.elements = 0
+        self.peak_elements = 0
+        self.bytes = 0
+        self.samples = 0
+        self.sampled = 0
+
+    def element_bytes(self):
+        if not self.samples:
+            return ENTRY_SIZE
+        return ENTRY_SIZE + self.sampled // self.samples
+
+    def sample(self, element):
+        self.sampled += element_size(element)
+        self.samples += 1
+
+
+class MemoryProfile(object):
+    """
+    Context manager that records the buffers of the operators run by the
+    current thread inside it. union, and order_by and group_by without
+    max_in_memory, buffer when they are created. The other operators buffer
+    when they are iterated
+    """
+
+    def __init__(self, max_bytes=None):
+        """
+        Constructor
+        :param max_bytes: limit of the estimated bytes buffered by all
+        operators at the same time. MemoryLimitExceeded is raised when it is
+        exceeded. None for no limit
+        """
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError(u"max_bytes must be a positive integer")
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.peak_bytes = 0
+        self._buffers = {}
+        self._order = []
+
+    def __enter__(self):
+        _profiles.setdefault(get_ident(), []).append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        ident = get_ident()
+        stack = _profiles[ident]
+        stack.remove(self)
+        if not stack:
+            del _profiles[ident]
+        return False
+
+    def _buffer(self, node):
+        buffer = self._buffers.get(id(node))
+        if buffer is None:
+            buffer = self._buffers[id(node)] = _Buffer(type(node).__name__)
+            # keep node alive so that its id is not reused by another operator
+            self._order.append((node, buffer))
+        return buffer
+
+    def track(self, node, count, element):
+        """
+        Records that an operator buffers count elements after adding element
+        :param node: the operator
+        :param count: number of elements buffered by the operator
+        :param element: the element that was added
+        """
+        buffer = self._buffer(node)
+        if count <= SAMPLE_START or count % SAMPLE_INTERVAL == 0:
+            buffer.sample(element)
+        self._resize(buffer, count)
+
+    def track_all(self, node, elements):
+        """
+        Records that an operator buffers all elements of a list
+        :param node: the operator
+        :param elements: list of the buffered elements
+        """
+        buffer = self._buffer(node)
+        step = max(1, len(elements) // SAMPLE_INTERVAL)
+        for element in elements[:SAMPLE_START] + elements[SAMPLE_START::step]:
+            buffer.sample(element)
+        self._resize(buffer, len(elements))
+
+    def collect(self, node, iterable):
+        """
+        Reads elements into a list, recording the growing buffer of an
+        operator so that the limit is checked before the list is complete
+        :param node: the operator
+        :param iterable: the elements to buffer
+        :return: list of elements
+        """
+        elements = []
+        for n, element in enumerate(iterable, 1):
+            elements.append(element)
+            self.track(node, n, element)
+        return elements
+
+    def release(self, node):
+        """
+        Records that an operator no longer buffers any elements
+        :param node: the operator
+        """
+        buffer = self._buffers.get(id(node))
+        if buffer is not None:
+            self._resize(buffer, 0)
+
+    def _resize(self, buffer, count):
+        size = count * buffer.element_bytes()
+        self.bytes += size - buffer.bytes
+        buffer.bytes = size
+        buffer.elements = count
+        if count > buffer.peak_elements:
+            buffer.peak_elements = count
+        if self.bytes > self.peak_bytes:
+            self.peak_bytes = self.bytes
+            if self.max_bytes is not None and self.bytes > self.max_bytes:
+                raise MemoryLimitExceeded(
+                    u"{0} buffered {1} elements, bringing the query to about "
+                    u"{2} bytes over the limit of {3} bytes".format(
+                        buffer.name, count, self.bytes, self.max_bytes
+                    )
+                )
+
+    @property
+    def operators(self):
+        """
+        :return: list of OperatorMemory tuples in the order the operators
+        first buffered elements
+        """
+        return [
+            OperatorMemory(b.name, b.peak_elements, b.peak_elements * b.element_bytes())
+            for node, b in self._order
+        ]
+
+    def __str__(self):
+        lines = [
+            u"{0:<32} {1:>14} {2:>14}".format(u"operator", u"peak elements", u"peak bytes")
+        ]
+        for o in self.operators:
+            lines.append(
+                u"{0:<32} {1:>14} {2:>14}".format(
+                    o.operator, o.peak_elements, o.peak_bytes
+                )
+            )
+        lines.append(u"{0:<32} {1:>14} {2:>14}".format(u"total", u"", self.peak_bytes))
+        return u"\n".join(lines)
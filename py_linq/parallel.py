@@ -0,0 +1,158 @@
+"""
+Partitioned execution of key based operators in worker processes. The inputs
+are hash partitioned by key to temporary files using a process independent
+hash, one forked worker process runs the operator on each partition and the
+results are streamed back partition by partition. Partitions and the order of
+the results are therefore the same on every run.
+"""
+
+import multiprocessing
+import os
+import pickle
+import sys
+import traceback
+
+from .core import stable_hash
+from .external import SpillFile
+
+HASH_CACHE_SIZE = 1 << 16
+
+
+def default_workers():
+    """
+    :return: the number of CPUs, used as the default number of workers
+    """
+    return os.cpu_count() or 1
+
+
+def partition(iterable, key, partitions):
+    """
+    Hash partitions elements by key to temporary files
+    :param iterable: the elements to partition. Elements must be picklable
+    :param key: key selector. Keys must be json serializable, and equal keys
+    must serialize equally
+    :param partitions: the number of partitions
+    :return: list of SpillFile instances
+    """
+    parts = [SpillFile() for i in range(partitions)]
+    # hashes of recently seen keys, since keys usually repeat
+    hashes = {}
+    try:
+        for element in iterable:
+            k = key(element)
+            try:
+                h = hashes.get(k)
+            except TypeError:
+                h = stable_hash(k)
+            if h is None:
+                h = stable_hash(k)
+                if len(hashes) >= HASH_CACHE_SIZE:
+                    hashes.clear()
+                hashes[k] = h
+            parts[h % partitions].write(element)
+        for part in parts:
+            part.flush()
+    except BaseException:
+        for part in parts:
+            part.close()
+        raise
+    return parts
+
+
+def _work(task, inputs, output, error):
+    try:
+        output.write_all(task(*inputs))
+        output.flush()
+    except BaseException as e:
+        details = traceback.format_exc()
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(details)
+        error.write(e)
+        error.flush()
+        sys.exit(1)
+
+
+def _raise_failure(process, error):
+    for exception in error:
+        raise exception
+    raise RuntimeError(
+        u"Worker process exited with code {0}".format(process.exitcode)
+    )
+
+
+def run(task, inputs):
+    """
+    Runs a task on each partition of the inputs, in one forked process per
+    partition. Without fork support the partitions are processed one after the
+    other in this process
+    :param task: function taking one partition of each input and returning an
+    iterable of picklable results
+    :param inputs: list of lists of SpillFile instances, one list per input
+    with one SpillFile per partition. The files are closed when done
+    :return: generator of results in partition order
+    """
+    partitions = [list(parts) for parts in zip(*inputs)]
+    files = [p for parts in inputs for p in parts]
+    processes = []
+    try:
+        if "fork" not in multiprocessing.get_all_start_methods():
+            for parts in partitions:
+                for result in task(*parts):
+                    yield result
+            return
+        context = multiprocessing.get_context("fork")
+        for parts in partitions:
+            output = SpillFile()
+            error = SpillFile()
+            files.extend([output, error])
+            process = context.Process(target=_work, args=(task, parts, output, error))
+            process.start()
+            processes.append((process, output, error))
+        for process, output, error in processes:
+            process.join()
+            if process.exitcode != 0:
+                _raise_failure(process, error)
+            for result in output:
+                yield result
+            output.close()
+    finally:
+        for process, output, error in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        for f in files:
+            f.close()
+
+
+class PartitionedJob(object):
+    """
+    Re-iterable source that partitions its inputs and runs a task on each
+    partition every time it is iterated
+    """
+
+    def __init__(self, task, inputs, workers):
+        """
+        Constructor
+        :param task: function taking one partition of each input and returning
+        an iterable of picklable results
+        :param inputs: list of (iterable, key selector) tuples
+        :param workers: the number of partitions and worker processes
+        """
+        self.task = task
+        self.inputs = inputs
+        self.workers = workers
+
+    def __iter__(self):
+        parts = []
+        try:
+            for iterable, key in self.inputs:
+                parts.append(partition(iterable, key, self.workers))
+        except BaseException:
+            for p in parts:
+                for part in p:
+                    part.close()
+            raise
+        for result in run(self.task, parts):
+            yield result
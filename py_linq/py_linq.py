@@ -1,26 +1,46 @@
 import itertools
-import json
 import io
-
-# python 2 to 3 compatibility imports
-try:
-    from itertools import imap as map
-    from itertools import ifilter as filter
-    from itertools import izip as zip
-except ImportError:
-    pass
-from builtins import range
-from .core import Key, OrderingDirection
+import time
+from collections import OrderedDict, deque
+
+from .core import (
+    Key,
+    LazyModule,
+    OrderingDirection,
+    identity,
+    key_class,
+    key_map,
+    resolve,
+    resolve_first,
+    same_key,
+    selector,
+)
+from .aggregates import Aggregate
 from .decorators import deprecated
+from .memory import MemoryProfile, active_profile
 from .exceptions import (
+    KeyLimitExceeded,
     NoElementsError,
     NoMatchingElement,
     NullArgumentError,
     MoreThanOneMatchingElement,
 )
 
+# subsystems that are only needed by some operators are imported on first use
+json = LazyModule("json")
+external = LazyModule("py_linq.external")
+files = LazyModule("py_linq.files")
+sketches = LazyModule("py_linq.sketches")
+compiler = LazyModule("py_linq.compiler")
+parallel = LazyModule("py_linq.parallel")
+heapq = LazyModule("heapq")
+records = LazyModule("py_linq.records")
+readahead = LazyModule("py_linq.readahead")
+
 
 class Enumerable(object):
+    __slots__ = ("_data", "_cycle")
+
     def __init__(self, data=None):
         """
         Constructor
@@ -46,10 +66,8 @@ class Enumerable(object):
         return self._data
 
     def __iter__(self):
-        i = 0
-        while i < len(self):
-            yield next(self._cycle)
-            i += 1
+        for element in self._data:
+            yield element
 
     def next(self):
         return next(self._cycle)
@@ -87,6 +105,68 @@ class Enumerable(object):
         """
         return [x for x in self]
 
+    def write_to(
+        self, fileobj, serializer=lambda x: u"{0}\n".format(x), batch_size=1000
+    ):
+        """
+        Writes the elements to a file object in batches without materializing
+        the collection
+        :param fileobj: text or binary file object
+        :param serializer: lambda expression that converts an element to str
+        or bytes, including any separator
+        :param batch_size: number of elements written per write call
+        :return: WriteResult of the number of elements and bytes written
+        """
+        if batch_size < 1:
+            raise ValueError(u"batch_size must be a positive integer")
+        return files.write_chunks(
+            fileobj, files.serialized_chunks(self, serializer, batch_size)
+        )
+
+    def to_jsonl(self, path, compression="infer", batch_size=1000):
+        """
+        Writes the elements to a JSON lines file in batches without
+        materializing the collection
+        :param path: path to the file
+        :param compression: "gzip", "bz2", "xz", None for no compression or
+        "infer" to choose from the file extension
+        :param batch_size: number of elements written per write call
+        :return: WriteResult of the number of elements and uncompressed bytes
+        written
+        """
+        with files.open_binary_writer(path, compression) as f:
+            return self.write_to(f, files.jsonl_serializer, batch_size)
+
+    def to_csv(
+        self,
+        path,
+        columns=None,
+        header=True,
+        compression="infer",
+        batch_size=1000,
+        **fmtparams
+    ):
+        """
+        Writes the elements to a CSV file in batches without materializing the
+        collection. Elements are dicts or sequences of values
+        :param path: path to the file
+        :param columns: column names. Selects the values of dict elements. If
+        None, the keys of the first dict element are used
+        :param header: if True, the column names are written as the first row
+        :param compression: "gzip", "bz2", "xz", None for no compression or
+        "infer" to choose from the file extension
+        :param batch_size: number of elements written per write call
+        :param fmtparams: formatting parameters passed to csv.writer
+        :return: WriteResult of the number of elements and uncompressed bytes
+        written
+        """
+        if batch_size < 1:
+            raise ValueError(u"batch_size must be a positive integer")
+        with files.open_binary_writer(path, compression) as f:
+            return files.write_chunks(
+                f, files.csv_chunks(self, columns, header, batch_size, **fmtparams)
+            )
+
     def count(self, predicate=None):
         """
         Returns the number of elements in iterable
@@ -102,7 +182,7 @@ class Enumerable(object):
         :param func: lambda expression on how to perform transformation
         :return: new Enumerable object containing transformed data
         """
-        return SelectEnumerable(self, func)
+        return SelectEnumerable(self, selector(func))
 
     def sum(self, func=lambda x: x):
         """
@@ -110,27 +190,58 @@ class Enumerable(object):
         :param func: lambda expression to transform data
         :return: sum of selected elements
         """
-        return sum(func(x) for x in self)
+        return sum(key_map(selector(func), self))
 
-    def min(self, func=lambda x: x):
+    def min(self, func=identity):
         """
-        Returns the min value of data elements
+        Returns the min value of data elements. O(1) if the enumerable is
+        sorted by func
         :param func: lambda expression to transform data
         :return: minimum value
         """
+        func = selector(func)
+        descending = _sorted_by(self, func)
+        if descending is not None:
+            return func(self._sorted_end(not descending))
         if not self.any():
             raise NoElementsError(u"Iterable contains no elements")
-        return func(min(self, key=func))
+        return min(key_map(func, self))
 
-    def max(self, func=lambda x: x):
+    def max(self, func=identity):
         """
-        Returns the max value of data elements
+        Returns the max value of data elements. O(1) if the enumerable is
+        sorted by func and its first or last element can be read directly
         :param func: lambda expression to transform data
         :return: maximum value
         """
+        func = selector(func)
+        descending = _sorted_by(self, func)
+        if descending is not None:
+            return func(self._sorted_end(descending))
         if not self.any():
             raise NoElementsError(u"Iterable contains no elements")
-        return func(max(self, key=func))
+        return max(key_map(func, self))
+
+    def _sorted_end(self, first):
+        """
+        :param first: True for the first element, False for the last
+        :return: the first or last element, by index when possible. The
+        first element is read without enumerating the rest
+        """
+        items = _indexable(self)
+        if items is not None:
+            if not items:
+                raise NoElementsError(u"Iterable contains no elements")
+            return items[0] if first else items[-1]
+        if first:
+            element = next(iter(self), _END)
+        else:
+            element = _END
+            for element in self:
+                pass
+        if element is _END:
+            raise NoElementsError(u"Iterable contains no elements")
+        return element
 
     def avg(self, func=lambda x: x):
         """
@@ -150,6 +261,7 @@ class Enumerable(object):
         """
         if not self.any():
             raise NoElementsError(u"Iterable contains no elements")
+        func = selector(func)
         result = self.order_by(func).select(func).to_list()
         length = len(result)
         i = int(length / 2)
@@ -159,6 +271,70 @@ class Enumerable(object):
             else (float(result[i - 1]) + float(result[i])) / float(2)
         )
 
+    def approx_count_distinct(self, key=lambda x: x, precision=14):
+        """
+        Estimates the number of distinct keys in a single pass with fixed
+        memory using a HyperLogLog sketch. The relative standard error is
+        about 1.04 / sqrt(2 ** precision), 0.81% for the default precision
+        :param key: key selector as lambda expression or key path
+        :param precision: number of HyperLogLog index bits, between 4 and 16
+        :return: estimated number of distinct keys as int
+        """
+        return self._distinct_sketch(selector(key), precision).count()
+
+    def _distinct_sketch(self, key, precision):
+        return sketches.HyperLogLog(precision).update(key_map(key, self))
+
+    def approx_quantile(self, q, func=lambda x: x, k=200, seed=None):
+        """
+        Estimates the value at the given quantile in a single pass with fixed
+        memory using a KLL sketch. The rank of the returned value is within
+        about 1.7 / k of q with high probability
+        :param q: quantile between 0 and 1. 0.5 estimates the median
+        :param func: lambda expression to project data
+        :param k: sketch accuracy parameter
+        :param seed: seed for the sketch, for reproducible results
+        :return: estimated value at quantile q
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(u"q must be between 0 and 1")
+        sketch = self._quantile_sketch(selector(func), k, seed)
+        if sketch.n == 0:
+            raise NoElementsError(u"Iterable contains no elements")
+        return sketch.quantile(q)
+
+    def _quantile_sketch(self, func, k, seed):
+        sketch = sketches.QuantileSketch(k, seed)
+        for value in key_map(func, self):
+            sketch.add(value)
+        return sketch
+
+    def sample(self, k, seed=None):
+        """
+        Returns a uniform random sample of k elements, read in a single pass
+        that holds only k elements in memory. The sample keeps the order of
+        the elements
+        :param k: number of elements in the sample
+        :param seed: seed for the random numbers, for reproducible samples
+        :return: new Enumerable object
+        """
+        if not isinstance(k, int):
+            raise TypeError(u"k must be an integer")
+        if k < 0:
+            raise ValueError(u"k must not be negative")
+        return SampleEnumerable(self, k, seed)
+
+    def sample_fraction(self, p, seed=None):
+        """
+        Lazily takes each element independently with probability p
+        :param p: probability of taking an element, between 0 and 1
+        :param seed: seed for the random numbers, for reproducible samples
+        :return: new Enumerable object
+        """
+        if not 0 <= p <= 1:
+            raise ValueError(u"p must be between 0 and 1")
+        return SampleFractionEnumerable(self, p, seed)
+
     def element_at(self, n):
         """
         Returns element at given index.
@@ -230,27 +406,33 @@ class Enumerable(object):
             return self.where(func).reverse().first_or_default()
         return self.reverse().first_or_default()
 
-    def order_by(self, key):
+    def order_by(self, key, max_in_memory=None):
         """
         Returns new Enumerable sorted in ascending order by given key
-        :param key: key to sort by as lambda expression
+        :param key: key to sort by as lambda expression or key path
+        :param max_in_memory: maximum number of elements to sort in memory.
+        Larger data is sorted lazily with an external merge sort through
+        temporary files, so elements must be picklable. None for no limit
         :return: new Enumerable object
         """
         if key is None:
             raise NullArgumentError(u"No key for sorting given")
-        kf = [OrderingDirection(key, reverse=False)]
-        return SortedEnumerable(self, key_funcs=kf)
+        kf = [OrderingDirection(selector(key), reverse=False)]
+        return SortedEnumerable(self, key_funcs=kf, max_in_memory=max_in_memory)
 
-    def order_by_descending(self, key):
+    def order_by_descending(self, key, max_in_memory=None):
         """
         Returns new Enumerable sorted in descending order by given key
-        :param key: key to sort by as lambda expression
+        :param key: key to sort by as lambda expression or key path
+        :param max_in_memory: maximum number of elements to sort in memory.
+        Larger data is sorted lazily with an external merge sort through
+        temporary files, so elements must be picklable. None for no limit
         :return: new Enumerable object
         """
         if key is None:
             raise NullArgumentError(u"No key for sorting given")
-        kf = [OrderingDirection(key, reverse=True)]
-        return SortedEnumerable(self, key_funcs=kf)
+        kf = [OrderingDirection(selector(key), reverse=True)]
+        return SortedEnumerable(self, key_funcs=kf, max_in_memory=max_in_memory)
 
     def skip(self, n):
         """
@@ -316,7 +498,7 @@ class Enumerable(object):
         :param func: selector as lambda expression
         :return: new Enumerable object
         """
-        return SelectManyEnumerable(self, func)
+        return SelectManyEnumerable(self, selector(func))
 
     def add(self, element):
         """
@@ -338,7 +520,9 @@ class Enumerable(object):
             raise TypeError(u"enumerable argument must be an instance of Enumerable")
         return ConcatenateEnumerable(self, enumerable)
 
-    def group_by(self, key_names=[], key=lambda x: x, result_func=lambda x: x):
+    def group_by(
+        self, key_names=[], key=lambda x: x, result_func=lambda x: x, max_in_memory=None
+    ):
         """
         Groups an enumerable on given key selector. Index of key name
         corresponds to index of key lambda function.
@@ -367,27 +551,72 @@ class Enumerable(object):
             .select(lambda g: { 'key': g.key.id, 'count': g.count() }
 
         :param key_names: list of key names
-        :param key: key selector as lambda expression
+        :param key: key selector as lambda expression or key path
         :param result_func: transformation function as lambda expression
+        :param max_in_memory: maximum number of elements to group in memory.
+        If not None, grouping is deferred to iteration and larger data is hash
+        partitioned to temporary files and grouped one partition at a time,
+        so elements must be picklable. Groups are then returned partition by
+        partition instead of in order of first appearance
         :return: Enumerable of grouping objects
         """
-        return GroupedEnumerable(self, key, key_names, result_func)
+        return GroupedEnumerable(
+            self, selector(key), key_names, result_func, max_in_memory
+        )
+
+    def aggregate_by(
+        self, key_names=[], key=lambda x: x, result_func=lambda x: x, **aggregates
+    ):
+        """
+        Groups an enumerable on given key selector and computes aggregates of
+        each group without holding the elements of the groups. Only a running
+        state per group and aggregate is kept.
+
+        Usage:
+            Enumerable(_locations).aggregate_by(
+                key_names=['country'],
+                key=lambda x: x[0],
+                count=Count(),
+                total=Sum(lambda x: x[3]),
+            ).select(lambda g: (g.key.country, g.count, g.total))
+
+        :param key_names: list of key names
+        :param key: key selector as lambda expression or key path
+        :param result_func: transformation function as lambda expression
+        :param aggregates: Aggregate instances from py_linq.aggregates by name
+        :return: Enumerable of objects with a key property and a property for
+        each aggregate
+        """
+        for name, aggregate in aggregates.items():
+            if not isinstance(aggregate, Aggregate):
+                raise TypeError(u"{0} must be an Aggregate instance".format(name))
+        return AggregateEnumerable(
+            self, selector(key), key_names, result_func, aggregates
+        )
 
-    def distinct(self, key=lambda x: x):
+    def distinct(self, key=lambda x: x, max_keys=None, evict=False):
         """
         Returns enumerable containing elements that are distinct based on
-        given key selector
-        :param key: key selector as lambda expression
+        given key selector. Elements are yielded as soon as their key is
+        first seen
+        :param key: key selector as lambda expression or key path
+        :param max_keys: maximum number of keys to remember. None for no limit
+        :param evict: if True, the least recently seen key is forgotten when
+        max_keys is reached (an element may then be yielded again). If False,
+        KeyLimitExceeded is raised
         :return: new Enumerable object
         """
-        return DistinctEnumerable(self, key)
+        if max_keys is not None and max_keys < 1:
+            raise ValueError(u"max_keys must be a positive integer")
+        return DistinctEnumerable(self, selector(key), max_keys, evict)
 
     def join(
         self,
         inner_enumerable,
-        outer_key=lambda x: x,
-        inner_key=lambda x: x,
+        outer_key=identity,
+        inner_key=identity,
         result_func=lambda x: x,
+        max_in_memory=None,
     ):
         """
         Return enumerable of inner equi-join between two enumerables
@@ -395,13 +624,184 @@ class Enumerable(object):
         :param outer_key: key selector of outer enumerable as lambda expression
         :param inner_key: key selector of inner enumerable as lambda expression
         :param result_func: lambda expression to transform result of join
+        :param max_in_memory: maximum number of inner elements to hold in
+        memory. If not None, a hash join on hashable keys is used. When the
+        inner enumerable is larger, both sides are hash partitioned to
+        temporary files and joined one partition at a time, so elements must
+        be picklable. Results are then returned partition by partition.
+        If None and both enumerables are sorted by their join keys in the
+        same direction, a streaming merge join is used
+        :return: new Enumerable object
+        """
+        if not isinstance(inner_enumerable, Enumerable):
+            raise TypeError(
+                u"inner_enumerable parameter must be an instance of Enumerable"
+            )
+        outer_key = selector(outer_key)
+        inner_key = selector(inner_key)
+        descending = _merge_order(self, outer_key, inner_enumerable, inner_key)
+        if descending is not None and max_in_memory is None:
+            return MergeJoinEnumerable(
+                self, inner_enumerable, outer_key, inner_key, result_func, descending
+            )
+        return JoinEnumerable(
+            self, inner_enumerable, outer_key, inner_key, result_func, max_in_memory
+        )
+
+    def left_join(
+        self,
+        inner_enumerable,
+        outer_key=identity,
+        inner_key=identity,
+        result_func=lambda x: x,
+        max_in_memory=None,
+    ):
+        """
+        Return enumerable of left outer equi-join between two enumerables. A
+        hash table of the inner enumerable is built and the outer enumerable
+        is streamed. Outer elements without a match are joined with None.
+        Keys must be hashable
+        :param inner_enumerable: inner enumerable to join to self
+        :param outer_key: key selector of outer enumerable as lambda expression
+        :param inner_key: key selector of inner enumerable as lambda expression
+        :param result_func: lambda expression to transform result of join
+        :param max_in_memory: maximum number of inner elements to hold in
+        memory. When the inner enumerable is larger, both sides are hash
+        partitioned to temporary files, so elements must be picklable
+        :return: new Enumerable object
+        """
+        return self._outer_join(
+            inner_enumerable, outer_key, inner_key, result_func, max_in_memory, "left"
+        )
+
+    def right_join(
+        self,
+        inner_enumerable,
+        outer_key=identity,
+        inner_key=identity,
+        result_func=lambda x: x,
+        max_in_memory=None,
+    ):
+        """
+        Return enumerable of right outer equi-join between two enumerables. A
+        hash table of the outer enumerable is built and the inner enumerable
+        is streamed. Inner elements without a match are joined with None.
+        Keys must be hashable
+        :param inner_enumerable: inner enumerable to join to self
+        :param outer_key: key selector of outer enumerable as lambda expression
+        :param inner_key: key selector of inner enumerable as lambda expression
+        :param result_func: lambda expression to transform result of join
+        :param max_in_memory: maximum number of outer elements to hold in
+        memory. When the outer enumerable is larger, both sides are hash
+        partitioned to temporary files, so elements must be picklable
+        :return: new Enumerable object
+        """
+        return self._outer_join(
+            inner_enumerable, outer_key, inner_key, result_func, max_in_memory, "right"
+        )
+
+    def full_join(
+        self,
+        inner_enumerable,
+        outer_key=identity,
+        inner_key=identity,
+        result_func=lambda x: x,
+        max_in_memory=None,
+    ):
+        """
+        Return enumerable of full outer equi-join between two enumerables. A
+        hash table of the inner enumerable is built and the outer enumerable
+        is streamed. Elements of either side without a match are joined with
+        None; unmatched inner elements come last. Keys must be hashable
+        :param inner_enumerable: inner enumerable to join to self
+        :param outer_key: key selector of outer enumerable as lambda expression
+        :param inner_key: key selector of inner enumerable as lambda expression
+        :param result_func: lambda expression to transform result of join
+        :param max_in_memory: maximum number of inner elements to hold in
+        memory. When the inner enumerable is larger, both sides are hash
+        partitioned to temporary files, so elements must be picklable
+        :return: new Enumerable object
+        """
+        return self._outer_join(
+            inner_enumerable, outer_key, inner_key, result_func, max_in_memory, "full"
+        )
+
+    def _outer_join(
+        self, inner_enumerable, outer_key, inner_key, result_func, max_in_memory, kind
+    ):
+        if not isinstance(inner_enumerable, Enumerable):
+            raise TypeError(
+                u"inner_enumerable parameter must be an instance of Enumerable"
+            )
+        return OuterJoinEnumerable(
+            self,
+            inner_enumerable,
+            selector(outer_key),
+            selector(inner_key),
+            result_func,
+            max_in_memory,
+            kind,
+        )
+
+    def semi_join(self, inner_enumerable, outer_key=identity, inner_key=identity):
+        """
+        Returns the elements of self whose key matches the key of an element
+        of inner_enumerable. The inner keys are collected into a set once and
+        self is streamed. Each element of self is returned at most once
+        :param inner_enumerable: the enumerable whose keys to match
+        :param outer_key: key selector of outer enumerable as lambda expression
+        :param inner_key: key selector of inner enumerable as lambda expression
+        :return: new Enumerable object
+        """
+        if not isinstance(inner_enumerable, Enumerable):
+            raise TypeError(
+                u"inner_enumerable parameter must be an instance of Enumerable"
+            )
+        return SemiJoinEnumerable(
+            self, inner_enumerable, selector(outer_key), selector(inner_key)
+        )
+
+    def anti_join(self, inner_enumerable, outer_key=identity, inner_key=identity):
+        """
+        Returns the elements of self whose key does not match the key of any
+        element of inner_enumerable. The inner keys are collected into a set
+        once and self is streamed
+        :param inner_enumerable: the enumerable whose keys to match
+        :param outer_key: key selector of outer enumerable as lambda expression
+        :param inner_key: key selector of inner enumerable as lambda expression
         :return: new Enumerable object
         """
         if not isinstance(inner_enumerable, Enumerable):
             raise TypeError(
                 u"inner_enumerable parameter must be an instance of Enumerable"
             )
-        return JoinEnumerable(self, inner_enumerable, outer_key, inner_key, result_func)
+        return SemiJoinEnumerable(
+            self, inner_enumerable, selector(outer_key), selector(inner_key), True
+        )
+
+    def where_in(self, key, values):
+        """
+        Returns the elements whose key is one of the given values. The values
+        are collected into a set once
+        :param key: key selector as lambda expression or key path
+        :param values: iterable of key values. Iterators are read immediately
+        :return: new Enumerable object
+        """
+        if iter(values) is values:
+            values = list(values)
+        return SemiJoinEnumerable(self, values, selector(key), identity)
+
+    def where_not_in(self, key, values):
+        """
+        Returns the elements whose key is none of the given values. The
+        values are collected into a set once
+        :param key: key selector as lambda expression or key path
+        :param values: iterable of key values. Iterators are read immediately
+        :return: new Enumerable object
+        """
+        if iter(values) is values:
+            values = list(values)
+        return SemiJoinEnumerable(self, values, selector(key), identity, True)
 
     def default_if_empty(self, value=None):
         """
@@ -419,6 +819,7 @@ class Enumerable(object):
         outer_key=lambda x: x,
         inner_key=lambda x: x,
         result_func=lambda x: x,
+        max_in_memory=None,
     ):
         """
         Return enumerable of group join between two enumerables
@@ -427,6 +828,11 @@ class Enumerable(object):
         :param inner_key: key selector of inner enumerable as lambda expression
         :param result_func: lambda expression to transform the result of group
         join
+        :param max_in_memory: maximum number of inner elements to hold in
+        memory. If not None, inner elements are looked up by hashable key.
+        When the inner enumerable is larger, both sides are hash partitioned
+        to temporary files and joined one partition at a time, so elements
+        must be picklable. Results are then returned partition by partition
         :return: new Enumerable object
         """
         if not isinstance(inner_enumerable, Enumerable):
@@ -434,7 +840,12 @@ class Enumerable(object):
                 u"inner enumerable parameter must be an instance of Enumerable"
             )
         return GroupJoinEnumerable(
-            self, inner_enumerable, outer_key, inner_key, result_func
+            self,
+            inner_enumerable,
+            selector(outer_key),
+            selector(inner_key),
+            result_func,
+            max_in_memory,
         )
 
     def any(self, predicate=None):
@@ -445,16 +856,21 @@ class Enumerable(object):
         """
         return self.first_or_default(predicate) is not None
 
-    def intersect(self, enumerable, key=lambda x: x):
+    def intersect(self, enumerable, key=identity):
         """
         Returns enumerable that is the intersection between given enumerable
-        and self
+        and self. If both are sorted by key in the same direction, they are
+        merged in a single streaming pass
         :param enumerable: enumerable object
-        :param key: key selector as lambda expression
+        :param key: key selector as lambda expression or key path
         :return: new Enumerable object
         """
         if not isinstance(enumerable, Enumerable):
             raise TypeError(u"enumerable parameter must be an instance of Enumerable")
+        key = selector(key)
+        descending = _merge_order(self, key, enumerable, key)
+        if descending is not None:
+            return MergeIntersectEnumerable(self, enumerable, key, descending)
         return IntersectEnumerable(self, enumerable, key)
 
     def aggregate(self, func, seed=None):
@@ -474,37 +890,111 @@ class Enumerable(object):
             result = func(result, e)
         return result
 
-    def union(self, enumerable, key=lambda x: x):
+    def union(self, enumerable, key=identity):
         """
         Returns enumerable that is a union of elements between self and given
-        enumerable
+        enumerable. If both are sorted by key in the same direction, they are
+        merged in a streaming pass without a set of the keys, and the elements
+        keep the same order
         :param enumerable: enumerable to union self to
         :param key: key selector used to determine uniqueness
         :return: new Enumerable object
         """
         if not isinstance(enumerable, Enumerable):
             raise TypeError(u"enumerable parameter must be an instance of Enumerable")
+        key = selector(key)
+        descending = _merge_order(self, key, enumerable, key)
+        if descending is not None:
+            return MergeUnionEnumerable(self, enumerable, key, descending)
         return UnionEnumerable(self, enumerable, key)
 
-    def except_(self, enumerable, key=lambda x: x):
+    def except_(self, enumerable, key=identity):
         """
-        Returns enumerable that subtracts given enumerable elements from self
+        Returns enumerable that subtracts given enumerable elements from self.
+        If both are sorted by key in the same direction, they are merged in a
+        single streaming pass
         :param enumerable: enumerable object
-        :param key: key selector as lambda expression
+        :param key: key selector as lambda expression or key path
         :return: new Enumerable object
         """
         if not isinstance(enumerable, Enumerable):
             raise TypeError(u"enumerable parameter must be an instance of Enumerable")
+        key = selector(key)
+        descending = _merge_order(self, key, enumerable, key)
+        if descending is not None:
+            return MergeExceptEnumerable(self, enumerable, key, descending)
         return ExceptEnumerable(self, enumerable, key)
 
-    def contains(self, element, key=lambda x: x):
+    def contains(self, element, key=identity):
         """
-        Returns True if element is found in enumerable, otherwise False
+        Returns True if element is found in enumerable, otherwise False. Uses
+        a binary search if the enumerable is sorted by key and its elements
+        can be read by index
         :param element: the element being tested for membership in enumerable
         :param key: key selector to use for membership comparison
         :return: boolean True or False
         """
-        return self.select(key).any(lambda x: x == key(element))
+        key = selector(key)
+        value = key(element)
+        descending = _sorted_by(self, key)
+        items = _indexable(self) if descending is not None else None
+        if items is not None:
+            i = _bisect_left(items, value, key, descending)
+            return i < len(items) and key(items[i]) == value
+        return self.select(key).any(lambda x: x == value)
+
+    def assume_sorted(self, key=identity, descending=False):
+        """
+        Declares that the enumerable is sorted by key, without checking it.
+        join, intersect, except_ and union with another enumerable sorted by
+        the same key use streaming merge algorithms, and contains, min and
+        max on the key avoid a full scan. Keys are matched by key path or by
+        being the same function object
+        :param key: key selector as lambda expression or key path
+        :param descending: True if the enumerable is sorted in descending order
+        :return: new Enumerable object
+        """
+        return AssumedSortedEnumerable(self, selector(key), descending)
+
+    @staticmethod
+    def appendable(iterable=None):
+        """
+        Returns an Enumerable whose elements can be added to in place with
+        push and extend. Views created with materialize_incremental over it
+        are updated with only the elements added since their last refresh
+        :param iterable: initial elements
+        :return: AppendableEnumerable object
+        """
+        return AppendableEnumerable([] if iterable is None else list(iterable))
+
+    @staticmethod
+    def memory_profile(max_bytes=None):
+        """
+        Context manager that reports the elements buffered by each operator of
+        the queries run by the current thread inside it, such as the lists of
+        sorts and the tables of groupings, set operations and hash joins.
+        union, and order_by and group_by without max_in_memory, buffer when
+        they are created. The other operators buffer when they are iterated.
+        Bytes are estimated from the sizes of a sample of the buffered
+        elements
+        :param max_bytes: limit of the estimated bytes buffered at the same
+        time. MemoryLimitExceeded is raised when it is exceeded. None for no
+        limit
+        :return: MemoryProfile instance
+        """
+        return MemoryProfile(max_bytes)
+
+    @staticmethod
+    def merge_sorted(*sources, key=identity, descending=False):
+        """
+        Lazily merges enumerables that are each sorted by key into one sorted
+        enumerable. Elements with equal keys keep the order of the sources
+        :param sources: sorted enumerables or iterables
+        :param key: key selector as lambda expression or key path
+        :param descending: True if the sources are sorted in descending order
+        :return: new Enumerable object sorted by key
+        """
+        return MergeSortedEnumerable(list(sources), selector(key), descending)
 
     def all(self, predicate):
         """
@@ -531,6 +1021,15 @@ class Enumerable(object):
         """
         return Enumerable([element]).concat(self)
 
+    @staticmethod
+    def builder():
+        """
+        Returns a builder that collects elements with amortized O(1) appends
+        and produces an Enumerable of them
+        :return: EnumerableBuilder object
+        """
+        return EnumerableBuilder()
+
     @staticmethod
     def empty():
         """
@@ -559,6 +1058,84 @@ class Enumerable(object):
         """
         return RepeatEnumerable(element, length)
 
+    @staticmethod
+    def from_lines(path, encoding="utf-8", keep_newlines=False):
+        """
+        Generates a lazy sequence of the lines in a text file. The file is
+        reopened every time the sequence is iterated. gzip, bz2 and xz files
+        are decompressed transparently
+        :param path: path to the file
+        :param encoding: text encoding of the file
+        :param keep_newlines: if True, line endings are not stripped
+        :return: Enumerable of strings
+        """
+        return Enumerable(
+            files.FileSource(path, files.parse_lines(keep_newlines), encoding)
+        )
+
+    @staticmethod
+    def from_csv(path, columns=None, header=True, encoding="utf-8", **fmtparams):
+        """
+        Generates a lazy sequence of the rows in a CSV file. The file is
+        reopened every time the sequence is iterated. gzip, bz2 and xz files
+        are decompressed transparently
+        :param path: path to the file
+        :param columns: the columns to return. Column names if header is True,
+        otherwise column indexes. None returns all columns
+        :param header: if True, the first row holds the column names and rows
+        are returned as dicts, otherwise rows are returned as lists
+        :param encoding: text encoding of the file
+        :param fmtparams: formatting parameters passed to csv.reader
+        :return: Enumerable of dicts or lists
+        """
+        return Enumerable(
+            files.FileSource(
+                path,
+                files.parse_csv(columns, header, **fmtparams),
+                encoding,
+                newline="",
+            )
+        )
+
+    @staticmethod
+    def from_jsonl(path, encoding="utf-8"):
+        """
+        Generates a lazy sequence of the JSON documents in a JSON lines file.
+        The file is reopened every time the sequence is iterated. gzip, bz2 and
+        xz files are decompressed transparently
+        :param path: path to the file
+        :param encoding: text encoding of the file
+        :return: Enumerable of parsed JSON documents
+        """
+        return Enumerable(files.FileSource(path, files.parse_jsonl, encoding))
+
+    @staticmethod
+    def from_struct_file(path, struct_format, fields=None):
+        """
+        Generates a sequence of the fixed-size binary records of a file. The
+        file is memory mapped and records are unpacked lazily with the struct
+        module. skip, take, element_at and count do not read the records
+        :param path: path to the file
+        :param struct_format: struct format string of one record
+        :param fields: names of the values of a record. None for tuples
+        :return: StructEnumerable of records as named tuples
+        """
+        return Enumerable.from_buffer(records.map_file(path), struct_format, fields)
+
+    @staticmethod
+    def from_buffer(buffer, struct_format, fields=None):
+        """
+        Generates a sequence of the fixed-size binary records in a buffer
+        without copying it. Records are unpacked lazily with the struct
+        module. skip, take, element_at and count do not read the records
+        :param buffer: bytes, bytearray, memoryview, mmap or other object
+        supporting the buffer protocol
+        :param struct_format: struct format string of one record
+        :param fields: names of the values of a record. None for tuples
+        :return: StructEnumerable of records as named tuples
+        """
+        return StructEnumerable(records.RecordBuffer(buffer, struct_format, fields))
+
     def reverse(self):
         """
         Inverts the order of the elements in a sequence
@@ -600,17 +1177,218 @@ class Enumerable(object):
         """
         return TakeWhileEnumerable(self, predicate)
 
-    def zip(self, enumerable, func=lambda x: x):
+    def compile(self):
+        """
+        Compiles the chain of streaming operators (select, where,
+        select_many, skip, take, skip_while and take_while) that ends with
+        this Enumerable into a single generated loop. The result is the same
+        as iterating this Enumerable, with less overhead per element. Compiled
+        loops are cached by the sequence of operators, so compiling another
+        chain of the same shape reuses the generated code
+        :return: Enumerable object
+        """
+        source, steps = compiler.plan(self, _STREAMING_STAGES)
+        if not steps:
+            return self
+        function = compiler.pipeline_function(tuple(kind for kind, arg in steps))
+        return CompiledEnumerable(source, function, [arg for kind, arg in steps])
+
+    def materialize_incremental(self, **aggregates):
+        """
+        Materializes a query over an appendable Enumerable into a view that is
+        updated with only the elements appended since its last refresh. The
+        query is a chain of select, where and select_many, optionally ending
+        with distinct, group_by or aggregate_by. If aggregates are given, the
+        view holds one result with the aggregates of the elements of the
+        query instead of the elements. The view is refreshed when it is
+        iterated or refresh is called
+
+        Usage:
+            events = Enumerable.appendable()
+            totals = events.where(lambda e: e["ok"]).materialize_incremental(
+                count=Count(), total=Sum("amount")
+            )
+            events.extend(batch)
+            totals.first().total
+
+        :param aggregates: Aggregate instances from py_linq.aggregates by name
+        :return: IncrementalView object
+        """
+        for name, aggregate in aggregates.items():
+            if not isinstance(aggregate, Aggregate):
+                raise TypeError(u"{0} must be an Aggregate instance".format(name))
+        return IncrementalView(self, aggregates)
+
+    def chunk(self, n):
+        """
+        Splits a sequence into lists of n consecutive elements. The last list
+        contains the remaining elements and may be shorter than n
+        :param n: the number of elements in each chunk
+        :return: Enumerable of lists
+        """
+        if n < 1:
+            raise ValueError(u"n must be a positive integer")
+        return ChunkEnumerable(self, n)
+
+    def partitioned(self, workers=None):
+        """
+        Returns an enumerable whose group_by, aggregate_by, distinct, union,
+        intersect, except_, join, group_join, approx_count_distinct and
+        approx_quantile run in worker processes. The inputs are hash
+        partitioned by key with a process independent hash, each worker runs
+        the operator on one partition and the results are returned partition
+        by partition. where, select and select_many keep the enumerable
+        partitioned; other operators return ordinary enumerables. Elements
+        and results must be picklable and keys must be json serializable.
+        Requires the fork start method; elsewhere partitions are processed one
+        after the other
+        :param workers: the number of worker processes. None for the number
+        of CPUs
+        :return: PartitionedEnumerable object
+        """
+        if workers is not None and workers < 1:
+            raise ValueError(u"workers must be a positive integer")
+        return PartitionedEnumerable(self, workers)
+
+    def prefetch(self, buffer_size=1000):
+        """
+        Reads the elements on a background thread ahead of the consumer, so
+        that waiting on a slow source overlaps with processing the elements
+        already read. Exceptions of the source are raised to the consumer.
+        When iteration stops early, the source is closed and the thread is
+        joined
+        :param buffer_size: number of elements to read ahead
+        :return: new Enumerable object
+        """
+        if buffer_size < 1:
+            raise ValueError(u"buffer_size must be a positive integer")
+        return PrefetchEnumerable(self, buffer_size)
+
+    def select_batch(self, func, batch_size=1000, target_latency=None):
+        """
+        Transforms data a batch at a time. func is called with a list of
+        consecutive elements and must return a list of the same length. The
+        results are returned one element at a time
+        :param func: lambda expression transforming a list of elements
+        :param batch_size: the number of elements in each batch. The initial
+        batch size if target_latency is given
+        :param target_latency: seconds each call of func should take. If not
+        None, the batch size is adapted after every batch to approach it
+        :return: new Enumerable object
+        """
+        if batch_size < 1:
+            raise ValueError(u"batch_size must be a positive integer")
+        if target_latency is not None and target_latency <= 0:
+            raise ValueError(u"target_latency must be positive")
+        return SelectBatchEnumerable(self, func, batch_size, target_latency)
+
+    def window(self, size, step=1):
+        """
+        Returns overlapping windows of consecutive elements as tuples. Only
+        complete windows are returned
+        :param size: the number of elements in each window
+        :param step: the number of elements to advance between windows
+        :return: Enumerable of tuples
+        """
+        if size < 1 or step < 1:
+            raise ValueError(u"size and step must be positive integers")
+        return WindowEnumerable(self, size, step)
+
+    def tumbling_window(self, ts_func, size, allowed_lateness=0, **aggregates):
+        """
+        Groups elements into consecutive, non-overlapping windows of event
+        time in a single pass. Window n covers the timestamps from n * size up
+        to (n + 1) * size. A window is returned when it closes, that is when
+        an element with a timestamp of at least its end plus allowed_lateness
+        is read, and the remaining windows at the end of the data. Elements
+        that arrive for windows that are already closed are dropped
+        :param ts_func: lambda expression or key path selecting the numeric
+        timestamp of an element
+        :param size: length of a window in the unit of the timestamps
+        :param allowed_lateness: how far behind the latest timestamp an
+        element may be and still be added to its window
+        :param aggregates: Aggregate instances from py_linq.aggregates by name.
+        If given, windows are returned as aggregates instead of groupings
+        :return: Enumerable of Grouping objects with a key of start and end,
+        or of objects with a key property and a property for each aggregate
+        """
+        return self.sliding_window(ts_func, size, size, allowed_lateness, **aggregates)
+
+    def sliding_window(self, ts_func, size, slide, allowed_lateness=0, **aggregates):
+        """
+        Groups elements into windows of event time that start every slide
+        and cover size, in a single pass. Window n covers the timestamps from
+        n * slide up to n * slide + size, so each element belongs to about
+        size / slide windows. Windows are returned in order of their start
+        when they close, as in tumbling_window
+        :param ts_func: lambda expression or key path selecting the numeric
+        timestamp of an element
+        :param size: length of a window in the unit of the timestamps
+        :param slide: time between the starts of consecutive windows
+        :param allowed_lateness: how far behind the latest timestamp an
+        element may be and still be added to its windows
+        :param aggregates: Aggregate instances from py_linq.aggregates by name.
+        If given, windows are returned as aggregates instead of groupings
+        :return: Enumerable of Grouping objects with a key of start and end,
+        or of objects with a key property and a property for each aggregate
+        """
+        if size <= 0 or slide <= 0:
+            raise ValueError(u"size and slide must be positive")
+        if allowed_lateness < 0:
+            raise ValueError(u"allowed_lateness must not be negative")
+        for name, aggregate in aggregates.items():
+            if not isinstance(aggregate, Aggregate):
+                raise TypeError(u"{0} must be an Aggregate instance".format(name))
+        return EventWindowEnumerable(
+            self, selector(ts_func), size, slide, allowed_lateness, aggregates
+        )
+
+    def zip(self, *enumerables, **kwargs):
         """
-        Merges 2 Enumerables using the given function. If the 2 collections are of unequal length, then
-        merging continues until the end of one of the collections is reached
-        :param enumerable: Enumerable collection to merge with
-        :param func: a function to perform the merging
+        Merges Enumerables element by element using the given function. If
+        the collections are of unequal length, then merging continues until
+        the end of the shortest collection is reached. Each collection is
+        iterated once
+        :param enumerables: Enumerable collections to merge with
+        :param func: a function to perform the merging, called with a tuple
+        of one element of each collection. For backward compatibility it can
+        also be given as the last positional argument
         :return: Enumerable
         """
-        if not isinstance(enumerable, Enumerable):
-            raise TypeError()
-        return ZipEnumerable(self, enumerable, func)
+        enumerables, func = self._zip_args(enumerables, kwargs)
+        return ZipEnumerable(self, enumerables, func)
+
+    def zip_longest(self, *enumerables, **kwargs):
+        """
+        Merges Enumerables element by element using the given function until
+        the end of the longest collection is reached. Missing elements of
+        shorter collections are replaced by fill. Each collection is iterated
+        once
+        :param enumerables: Enumerable collections to merge with
+        :param fill: value used for missing elements
+        :param func: a function to perform the merging, called with a tuple
+        of one element of each collection
+        :return: Enumerable
+        """
+        fill = kwargs.pop("fill", None)
+        enumerables, func = self._zip_args(enumerables, kwargs)
+        return ZipLongestEnumerable(self, enumerables, func, fill)
+
+    @staticmethod
+    def _zip_args(enumerables, kwargs):
+        func = kwargs.pop("func", None)
+        if kwargs:
+            raise TypeError(
+                u"Unexpected keyword arguments {0}".format(", ".join(sorted(kwargs)))
+            )
+        if func is None and enumerables and callable(enumerables[-1]):
+            func = enumerables[-1]
+            enumerables = enumerables[:-1]
+        if not enumerables:
+            raise TypeError(u"At least one enumerable to zip with is required")
+        if not all(isinstance(e, Enumerable) for e in enumerables):
+            raise TypeError(u"enumerable arguments must be instances of Enumerable")
+        return enumerables, (lambda x: x) if func is None else selector(func)
 
 
 class SelectEnumerable(Enumerable):
@@ -623,8 +1401,7 @@ class SelectEnumerable(Enumerable):
         self.func = func
 
     def __iter__(self):
-        for e in self.data:
-            yield self.func(e)
+        return key_map(self.func, self.data)
 
     def next(self):
         return self.func(next(self.data))
@@ -640,12 +1417,9 @@ class WhereEnumerable(Enumerable):
         self.predicate = predicate
 
     def __iter__(self):
-        i = 0
-        while i < len(self.data):
-            element = next(self._cycle)
+        for element in self.data:
             if self.predicate(element):
                 yield element
-            i += 1
 
     def next(self):
         element = next(self._cycle)
@@ -700,21 +1474,8 @@ class SkipWhileEnumerable(Enumerable):
         self._cycle = itertools.cycle(self.data)
 
     def __iter__(self):
-        i = 1
-        try:
-            e = next(self._cycle)
-        except StopIteration:
-            e = None
-        skip = False if e is None else self.predicate(e)
-        while skip:
-            e = next(self._cycle)
-            skip = self.predicate(e)
-            if skip:
-                i += 1
-        while i < len(self.data):
-            yield e
-            i += 1
-            e = next(self._cycle)
+        for element in itertools.dropwhile(self.predicate, self.data):
+            yield element
 
     def __len__(self):
         return sum(1 for e in self)
@@ -731,9 +1492,8 @@ class TakeEnumerable(Enumerable):
         self._cycle = itertools.cycle(itertools.islice(self.data, 0, n))
 
     def __iter__(self):
-        for index, element in enumerate(self.data):
-            if index < self.n:
-                yield element
+        for element in itertools.islice(self.data, max(self.n, 0)):
+            yield element
 
 
 class TakeWhileEnumerable(Enumerable):
@@ -747,20 +1507,8 @@ class TakeWhileEnumerable(Enumerable):
         self._cycle = itertools.cycle(self.data)
 
     def __iter__(self):
-        i = 1
-        try:
-            e = next(self._cycle)
-        except StopIteration:
-            e = None
-        take = False if e is None else self.predicate(e)
-        while take:
-            yield e
-            e = next(self._cycle)
-            take = self.predicate(e)
-            i += 1
-        while i < len(self.data):
-            next(self._cycle)
-            i += 1
+        for element in itertools.takewhile(self.predicate, self.data):
+            yield element
 
     def __len__(self):
         return sum(1 for e in self)
@@ -775,19 +1523,106 @@ class ReversedEnumerable(Enumerable):
         super(ReversedEnumerable, self).__init__(enumerable)
         self._cycle = itertools.cycle(reversed(self.data))
 
+    def __iter__(self):
+        profile = active_profile()
+        if profile is None:
+            for element in reversed(list(self.data)):
+                yield element
+            return
+        try:
+            for element in reversed(profile.collect(self, self.data)):
+                yield element
+        finally:
+            profile.release(self)
+
+
+class EnumerableBuilder(object):
+    """
+    Collects elements for an Enumerable. The elements are kept in a list
+    that is handed to the built Enumerable without copying. It is only
+    copied if elements are added after building
+    """
+
+    __slots__ = ("_elements", "_shared")
+
+    def __init__(self):
+        self._elements = []
+        self._shared = False
+
+    def _own(self):
+        if self._shared:
+            self._elements = list(self._elements)
+            self._shared = False
+        return self._elements
+
+    def append(self, element):
+        """
+        Adds an element to the end
+        :param element: An element
+        :return: self
+        """
+        self._own().append(element)
+        return self
+
+    def extend(self, iterable):
+        """
+        Adds the elements of an iterable to the end
+        :param iterable: iterable object
+        :return: self
+        """
+        self._own().extend(iterable)
+        return self
+
+    def to_enumerable(self):
+        """
+        :return: Enumerable of the elements added so far
+        """
+        self._shared = True
+        return Enumerable(self._elements)
+
+    def __len__(self):
+        return len(self._elements)
+
 
 class ConcatenateEnumerable(Enumerable):
     """
-    Class to hold state for concatenating Enumerable collections
+    Class to hold state for concatenating Enumerable collections. Nested
+    concatenations are flattened into one list of segments. Concatenating to
+    the most recent concatenation appends to its list in place, so the list
+    is shared and each instance only sees its first _count segments
     """
 
     def __init__(self, enumerable1, enumerable2):
         super(ConcatenateEnumerable, self).__init__(enumerable1)
         self.enumerable = enumerable2
-        self._cycle = itertools.cycle(itertools.chain(self.data, self.enumerable))
+        segments, count = self._segments_of(enumerable1)
+        if count < len(segments):
+            # the shared list was already extended by another concatenation
+            segments = segments[:count]
+        right, right_count = self._segments_of(enumerable2)
+        segments.extend(right[:right_count])
+        self._segments = segments
+        self._count = len(segments)
+        self._cycle = None
+
+    def next(self):
+        if self._cycle is None:
+            self._cycle = itertools.cycle(self)
+        return next(self._cycle)
+
+    @staticmethod
+    def _segments_of(enumerable):
+        if isinstance(enumerable, ConcatenateEnumerable):
+            return enumerable._segments, enumerable._count
+        return [enumerable], 1
+
+    def __iter__(self):
+        for segment in itertools.islice(self._segments, self._count):
+            for element in segment:
+                yield element
 
     def __len__(self):
-        return len(self.data) + len(self.enumerable)
+        return sum(len(s) for s in itertools.islice(self._segments, self._count))
 
 
 class IntersectEnumerable(Enumerable):
@@ -836,11 +1671,15 @@ class UnionEnumerable(Enumerable):
         self._cycle = itertools.cycle((k for k in self.union))
 
     def _load_data(self):
-        for i in self.data.concat(self.enumerable):
-            key = self.key(i)
+        profile = active_profile()
+        key_func, data = resolve_first(self.key, self.data.concat(self.enumerable))
+        for i in data:
+            key = key_func(i)
             key_hash = hash(json.dumps(key))
             if key_hash not in self.union:
                 self.union[key_hash] = i
+                if profile is not None:
+                    profile.track(self, len(self.union), i)
 
     def __iter__(self):
         i = 0
@@ -854,63 +1693,175 @@ class UnionEnumerable(Enumerable):
 
 
 class GroupedEnumerable(Enumerable):
-    def __init__(self, enumerable, key, key_names, func=lambda x: x):
+    def __init__(
+        self, enumerable, key, key_names, func=lambda x: x, max_in_memory=None
+    ):
         """
         Constructor for GroupedEnumerable class
         :param grouped_data: Iterable of grouped data
+        :param max_in_memory: maximum number of elements to group in memory. If
+        not None, grouping is deferred to iteration and larger data is grouped
+        one hash partition at a time
         """
+        if max_in_memory is not None and max_in_memory < 1:
+            raise ValueError(u"max_in_memory must be a positive integer")
         super(GroupedEnumerable, self).__init__(enumerable)
         self.key = key
         self.key_names = key_names
         self.func = func
         self.grouping = dict()
+        self._max_in_memory = max_in_memory
+        if max_in_memory is not None:
+            return
         self._load_data()
         self._cycle = itertools.cycle((k for k in self.grouping))
 
-    def _load_data(self):
-        for d in self.data:
-            key_value = self.key(d)
+    def _load_data(self, data=None, grouping=None):
+        data = self.data if data is None else data
+        grouping = self.grouping if grouping is None else grouping
+        profile = active_profile()
+        key, data = resolve_first(self.key, data)
+        for n, d in enumerate(data, 1):
+            key_value = key(d)
             kv_hash = self._create_key_hash(key_value)
-            if kv_hash not in self.grouping:
-                key_prop = {}
-                for i, prop in enumerate(self.key_names):
-                    key_prop[prop] = (
-                        key_value[i] if self._can_enumerate(key_value) else key_value
-                    )
-                self.grouping[kv_hash] = Grouping(Key(key_prop), [d])
+            if kv_hash not in grouping:
+                grouping[kv_hash] = Grouping(self._create_key(key_value), [d])
             else:
-                self.grouping[kv_hash].data.append(d)
+                grouping[kv_hash].data.append(d)
+            if profile is not None:
+                profile.track(self, n, d)
+        return grouping
+
+    def _create_key(self, key_value):
+        return _group_key(self.key_names, key_value)
 
     def _can_enumerate(self, key_value):
-        return hasattr(key_value, "__len__") and len(key_value) > 0
+        return _can_enumerate(key_value)
 
     def _create_key_hash(self, key_value):
-        return hash(json.dumps(key_value))
+        return _group_key_hash(key_value)
 
     def __iter__(self):
+        if self._max_in_memory is not None:
+            for g in self._iter_partitioned():
+                yield g
+            return
         i = 0
         while i < len(self):
             k = next(self._cycle)
             yield self.func(self.grouping[k])
             i += 1
 
+    def _iter_partitioned(self):
+        def key_hash(d):
+            return self._create_key_hash(self.key(d))
+
+        profile = active_profile()
+        try:
+            for rows in external.partition_by_key(
+                self.data, key_hash, self._max_in_memory
+            ):
+                for grouping in self._load_data(rows, dict()).values():
+                    yield self.func(grouping)
+                if profile is not None:
+                    profile.release(self)
+        finally:
+            if profile is not None:
+                profile.release(self)
+
     def __len__(self):
+        if self._max_in_memory is not None:
+            return sum(1 for g in self)
         return len(self.grouping)
 
 
-class Grouping(Enumerable):
-    def __init__(self, key, data):
-        """
-        Constructor of Grouping class used for group by operations of
-        Enumerable class
-        :param key: Key instance
-        :param data: iterable object
-        :return: void
-        """
+class AggregateEnumerable(Enumerable):
+    """
+    Class to hold state for computing aggregates of groups
+    """
+
+    def __init__(self, enumerable, key, key_names, func, aggregates):
+        super(AggregateEnumerable, self).__init__(enumerable)
+        self.key = key
+        self.key_names = key_names
+        self.func = func
+        self.names = list(aggregates)
+        self.aggregates = [aggregates[name] for name in self.names]
+
+    def _accumulate(self, groups, data):
+        """
+        Adds elements to the running states of the groups
+        :param groups: dict of key hash to (key, list of states)
+        :param data: iterable of elements
+        :return: groups
+        """
+        aggregates = self.aggregates
+        profile = active_profile()
+        key, data = resolve_first(self.key, data)
+        for d in data:
+            key_value = key(d)
+            kv_hash = _group_key_hash(key_value)
+            group = groups.get(kv_hash)
+            if group is None:
+                group = groups[kv_hash] = (
+                    _group_key(self.key_names, key_value),
+                    [a.initial() for a in aggregates],
+                )
+                if profile is not None:
+                    profile.track(self, len(groups), group)
+            states = group[1]
+            for i, a in enumerate(aggregates):
+                states[i] = a.step(states[i], d)
+        return groups
+
+    def _results(self, groups):
+        for key, states in groups.values():
+            result = dict(
+                (name, a.result(state))
+                for name, a, state in zip(self.names, self.aggregates, states)
+            )
+            result["key"] = key
+            yield self.func(Key(result))
+
+    def __iter__(self):
+        profile = active_profile()
+        try:
+            for result in self._results(self._accumulate(dict(), self.data)):
+                yield result
+        finally:
+            if profile is not None:
+                profile.release(self)
+
+    def __len__(self):
+        return sum(1 for g in self)
+
+
+class Grouping(Enumerable):
+    __slots__ = ("key",)
+
+    def __init__(self, key, data):
+        """
+        Constructor of Grouping class used for group by operations of
+        Enumerable class. No iteration state is allocated until the grouping
+        is iterated
+        :param key: Key instance
+        :param data: iterable object
+        :return: void
+        """
         if not isinstance(key, Key):
             raise Exception("key argument should be a Key instance")
         self.key = key
-        super(Grouping, self).__init__(data)
+        self._data = data
+
+    def next(self):
+        try:
+            cycle = self._cycle
+        except AttributeError:
+            cycle = self._cycle = itertools.cycle(self._data)
+        return next(cycle)
+
+    def __len__(self):
+        return len(self._data)
 
     def __repr__(self):
         return {
@@ -920,22 +1871,54 @@ class Grouping(Enumerable):
 
 
 class SortedEnumerable(Enumerable):
-    def __init__(self, enumerable, key_funcs):
+    def __init__(self, enumerable, key_funcs, max_in_memory=None):
         """
         Constructor
         :param key_funcs: list of OrderingDirection instances in order of primary key --> less important keys
         :param data: data as iterable
+        :param max_in_memory: maximum number of elements to sort in memory. If
+        not None, sorting is deferred to iteration and uses an external merge
+        sort when the data is larger
         """
         if key_funcs is None:
             raise NullArgumentError(u"key_funcs argument cannot be None")
         if not isinstance(key_funcs, list):
             raise TypeError(u"key_funcs should be a list instance")
+        if max_in_memory is not None and max_in_memory < 1:
+            raise ValueError(u"max_in_memory must be a positive integer")
         super(SortedEnumerable, self).__init__(enumerable)
         self._key_funcs = [f for f in key_funcs if isinstance(f, OrderingDirection)]
+        self._max_in_memory = max_in_memory
+        if max_in_memory is not None:
+            return
+        profile = active_profile()
+        if profile is None:
+            data = list(self._data)
+        else:
+            data = profile.collect(self, self._data)
         for o in reversed(self._key_funcs):
-            self._data = sorted(self._data, key=o.key, reverse=o.descending)
+            key = resolve(o.key, data[0]) if data else o.key
+            data.sort(key=key, reverse=o.descending)
+        self._data = data
         self._cycle = itertools.cycle(self._data)
 
+    def __iter__(self):
+        if self._max_in_memory is None:
+            return super(SortedEnumerable, self).__iter__()
+        return external.external_sort(self._data, self._key_funcs, self._max_in_memory)
+
+    @property
+    def sort_order(self):
+        """
+        (key, descending) of the primary sort key
+        """
+        primary = self._key_funcs[0]
+        return primary.key, primary.descending
+
+    def _then_by_source(self):
+        # an external sort is lazy, so re-sort the unsorted source instead
+        return self if self._max_in_memory is None else self._data
+
     def then_by(self, func):
         """
         Subsequent sorting function in ascending order
@@ -944,8 +1927,10 @@ class SortedEnumerable(Enumerable):
         """
         if func is None:
             raise NullArgumentError(u"then by requires a lambda function arg")
-        self._key_funcs.append(OrderingDirection(key=func, reverse=False))
-        return SortedEnumerable(self, self._key_funcs)
+        key_funcs = self._key_funcs + [
+            OrderingDirection(key=selector(func), reverse=False)
+        ]
+        return SortedEnumerable(self._then_by_source(), key_funcs, self._max_in_memory)
 
     def then_by_descending(self, func):
         """
@@ -957,32 +1942,44 @@ class SortedEnumerable(Enumerable):
             raise NullArgumentError(
                 u"then_by_descending requires a lambda function arg"
             )
-        self._key_funcs.append(OrderingDirection(key=func, reverse=True))
-        return SortedEnumerable(self, self._key_funcs)
+        key_funcs = self._key_funcs + [
+            OrderingDirection(key=selector(func), reverse=True)
+        ]
+        return SortedEnumerable(self._then_by_source(), key_funcs, self._max_in_memory)
 
 
 class ZipEnumerable(Enumerable):
     """
-    Class to hold state for zipping 2 collections together
+    Class to hold state for zipping collections together
     """
 
-    def __init__(self, enumerable1, enumerable2, result_func):
-        super(ZipEnumerable, self).__init__(enumerable1)
-        self.enumerable = enumerable2
+    def __init__(self, enumerable, enumerables, result_func):
+        super(ZipEnumerable, self).__init__(enumerable)
+        self.enumerables = enumerables
         self.result_func = result_func
-        self._cycle = itertools.cycle(
-            map(lambda r: self.result_func(r), zip(self.data, self.enumerable))
-        )
+        self._cycle = itertools.cycle(self)
+
+    def _zipped(self):
+        return zip(self.data, *self.enumerables)
 
     def __iter__(self):
-        i = 0
-        while i < len(self):
-            yield self.result_func((self.data[i], self.enumerable[i]))
-            i += 1
+        return map(self.result_func, self._zipped())
 
     def __len__(self):
-        length = min(len(self.data), len(self.enumerable))
-        return length
+        return sum(1 for t in self._zipped())
+
+
+class ZipLongestEnumerable(ZipEnumerable):
+    """
+    Class to hold state for zipping collections together up to the longest
+    """
+
+    def __init__(self, enumerable, enumerables, result_func, fill=None):
+        self.fill = fill
+        super(ZipLongestEnumerable, self).__init__(enumerable, enumerables, result_func)
+
+    def _zipped(self):
+        return itertools.zip_longest(self.data, *self.enumerables, fillvalue=self.fill)
 
 
 class RepeatEnumerable(Enumerable):
@@ -1010,18 +2007,56 @@ class DistinctEnumerable(Enumerable):
     Class to hold state for performing distinct iteration
     """
 
-    def __init__(self, enumerable, distinct_key):
+    def __init__(self, enumerable, distinct_key, max_keys=None, evict=False):
         super(DistinctEnumerable, self).__init__(enumerable)
         self.key = distinct_key
-        self.set = dict()
+        self.max_keys = max_keys
+        self.evict = evict
         self._cycle = itertools.cycle(self)
 
     def __iter__(self):
-        for element in self.data:
-            if not self.key(element) in self.set:
-                self.set[self.key(element)] = element
-        for k in self.set:
-            yield self.set[k]
+        profile = active_profile()
+        try:
+            for element in self._distinct(profile):
+                yield element
+        finally:
+            if profile is not None:
+                profile.release(self)
+
+    def _distinct(self, profile):
+        key, data = resolve_first(self.key, self.data)
+        if self.max_keys is None:
+            seen = set()
+            for element in data:
+                k = key(element)
+                if k not in seen:
+                    seen.add(k)
+                    if profile is not None:
+                        profile.track(self, len(seen), k)
+                    yield element
+            return
+        seen = OrderedDict()
+        for element in data:
+            k = key(element)
+            if k in seen:
+                # refresh the key so that it is the last to be evicted
+                seen[k] = seen.pop(k)
+                continue
+            if len(seen) >= self.max_keys:
+                if not self.evict:
+                    raise KeyLimitExceeded(
+                        u"distinct exceeded the limit of {0} keys".format(
+                            self.max_keys
+                        )
+                    )
+                seen.popitem(last=False)
+            seen[k] = None
+            if profile is not None:
+                profile.track(self, len(seen), k)
+            yield element
+
+    def __len__(self):
+        return sum(1 for e in self)
 
 
 class JoinEnumerable(Enumerable):
@@ -1030,7 +2065,13 @@ class JoinEnumerable(Enumerable):
     """
 
     def __init__(
-        self, outer_enumerable, inner_enumerable, outer_key, inner_key, result_func
+        self,
+        outer_enumerable,
+        inner_enumerable,
+        outer_key,
+        inner_key,
+        result_func,
+        max_in_memory=None,
     ):
         """
         Constructor
@@ -1039,49 +2080,96 @@ class JoinEnumerable(Enumerable):
         :param outer_key -> lambda function for selecting the outer enumerable key
         :param inner_key -> lambda function for selecting the inner enumerable key
         :param result_func -> lambda function for transforming the result
+        :param max_in_memory -> maximum number of inner elements held in memory
+        by a partitioned hash join. None for a nested loop join
         """
+        if max_in_memory is not None and max_in_memory < 1:
+            raise ValueError(u"max_in_memory must be a positive integer")
         super(JoinEnumerable, self).__init__(outer_enumerable)
         self.inner_enumerable = inner_enumerable
         self.outer_key = outer_key
         self.inner_key = inner_key
         self.result_func = result_func
+        self.max_in_memory = max_in_memory
         self.data_cycle = itertools.cycle(self.data)
         self.enumerable_cycle = itertools.cycle(self.inner_enumerable)
         self._cycle = itertools.cycle(self)
 
+    def _partitions(self):
+        """
+        Hash partitions the outer and inner enumerables so that each inner
+        partition fits in memory
+        :return: generator of (outer iterable, dict of inner key to list of
+        inner elements) tuples
+        """
+        pairs = external.partition_pairs(
+            self.data,
+            lambda o: hash(self.outer_key(o)),
+            self.inner_enumerable,
+            lambda i: hash(self.inner_key(i)),
+            self.max_in_memory,
+        )
+        profile = active_profile()
+        try:
+            for outer, inner in pairs:
+                table = dict()
+                inner_key, inner = resolve_first(self.inner_key, inner)
+                for n, i in enumerate(inner, 1):
+                    table.setdefault(inner_key(i), []).append(i)
+                    if profile is not None:
+                        profile.track(self, n, i)
+                yield outer, table
+                if profile is not None:
+                    profile.release(self)
+        finally:
+            if profile is not None:
+                profile.release(self)
+
     def __iter__(self):
+        if self.max_in_memory is not None:
+            for outer, table in self._partitions():
+                outer_key, outer = resolve_first(self.outer_key, outer)
+                for o in outer:
+                    for inner in table.get(outer_key(o), ()):
+                        yield self.result_func((o, inner))
+            return
+        outer_key = inner_key = None
         i = 0
         while i < len(self.data):
             o = next(self.data_cycle)
-            ok = self.outer_key(o)
+            if outer_key is None:
+                outer_key = resolve(self.outer_key, o)
+            ok = outer_key(o)
             j = 0
             while j < len(self.inner_enumerable):
                 inner = next(self.enumerable_cycle)
-                ik = self.inner_key(inner)
+                if inner_key is None:
+                    inner_key = resolve(self.inner_key, inner)
+                ik = inner_key(inner)
                 if ok == ik:
                     yield self.result_func((o, inner))
                 j += 1
             i += 1
 
 
-class GroupJoinEnumerable(Enumerable):
+class GroupJoinEnumerable(JoinEnumerable):
     """
     Class to hold state for performing group join
     """
 
-    def __init__(
-        self, outer_enumerable, inner_enumerable, outer_key, inner_key, result_func
-    ):
-        super(GroupJoinEnumerable, self).__init__(outer_enumerable)
-        self.inner_enumerable = inner_enumerable
-        self.outer_key = outer_key
-        self.inner_key = inner_key
-        self.result_func = result_func
-        self._cycle = itertools.cycle(self)
-
     def __iter__(self):
-        for o in self.data:
-            ok = self.outer_key(o)
+        if self.max_in_memory is not None:
+            for outer, table in self._partitions():
+                outer_key, outer = resolve_first(self.outer_key, outer)
+                for o in outer:
+                    ok = outer_key(o)
+                    yield self.result_func(
+                        (o, Grouping(Key({"id": ok}), table.get(ok, [])))
+                    )
+            return
+        outer_key, data = resolve_first(self.outer_key, self.data)
+        for o in data:
+            ok = outer_key(o)
             result = self.result_func(
                 (
                     o,
@@ -1092,3 +2180,1051 @@ class GroupJoinEnumerable(Enumerable):
                 )
             )
             yield result
+
+
+class SemiJoinEnumerable(Enumerable):
+    """
+    Class to hold state for filtering a collection by the keys of another
+    """
+
+    def __init__(self, enumerable, keys, outer_key, inner_key, negate=False):
+        super(SemiJoinEnumerable, self).__init__(enumerable)
+        self.keys = keys
+        self.outer_key = outer_key
+        self.inner_key = inner_key
+        self.negate = negate
+
+    def _key_set(self, profile):
+        if profile is None:
+            keys = list(key_map(self.inner_key, self.keys))
+        else:
+            keys = profile.collect(self, key_map(self.inner_key, self.keys))
+        try:
+            return set(keys)
+        except TypeError:
+            # unhashable keys are compared one by one
+            return keys
+
+    def __iter__(self):
+        profile = active_profile()
+        try:
+            keys = self._key_set(profile)
+            negate = self.negate
+            outer_key, data = resolve_first(self.outer_key, self.data)
+            for element in data:
+                if (outer_key(element) in keys) != negate:
+                    yield element
+        finally:
+            if profile is not None:
+                profile.release(self)
+
+
+class OuterJoinEnumerable(JoinEnumerable):
+    """
+    Class to hold state for performing left, right or full outer hash join
+    of 2 enumerables
+    """
+
+    def __init__(
+        self,
+        outer_enumerable,
+        inner_enumerable,
+        outer_key,
+        inner_key,
+        result_func,
+        max_in_memory=None,
+        kind="left",
+    ):
+        """
+        Constructor
+        :param kind -> "left", "right" or "full"
+        """
+        if kind not in ("left", "right", "full"):
+            raise ValueError(u"Unknown join kind {0}".format(kind))
+        super(OuterJoinEnumerable, self).__init__(
+            outer_enumerable,
+            inner_enumerable,
+            outer_key,
+            inner_key,
+            result_func,
+            max_in_memory,
+        )
+        self.kind = kind
+
+    def _pairs(self, probe, probe_key, build, build_key):
+        """
+        :return: generator of (probe iterable, build list) tuples
+        """
+        profile = active_profile()
+        if self.max_in_memory is None:
+            if profile is None:
+                yield probe, list(build)
+            else:
+                yield probe, profile.collect(self, build)
+            return
+        for probe_part, build_rows in external.partition_pairs(
+            probe,
+            lambda p: hash(probe_key(p)),
+            build,
+            lambda b: hash(build_key(b)),
+            self.max_in_memory,
+        ):
+            if profile is not None:
+                profile.track_all(self, build_rows)
+            yield probe_part, build_rows
+
+    def __iter__(self):
+        swap = self.kind == "right"
+        if swap:
+            probe, probe_key = self.inner_enumerable, self.inner_key
+            build, build_key = self.data, self.outer_key
+        else:
+            probe, probe_key = self.data, self.outer_key
+            build, build_key = self.inner_enumerable, self.inner_key
+
+        def result(p, b):
+            return self.result_func((b, p) if swap else (p, b))
+
+        profile = active_profile()
+        try:
+            for probe_part, build_rows in self._pairs(
+                probe, probe_key, build, build_key
+            ):
+                table = dict()
+                build_getter = resolve(build_key, build_rows[0]) if build_rows else None
+                for b in build_rows:
+                    table.setdefault(build_getter(b), []).append(b)
+                matched = set()
+                probe_getter, probe_part = resolve_first(probe_key, probe_part)
+                for p in probe_part:
+                    k = probe_getter(p)
+                    rows = table.get(k)
+                    if rows is None:
+                        yield result(p, None)
+                        continue
+                    matched.add(k)
+                    for b in rows:
+                        yield result(p, b)
+                if self.kind == "full":
+                    for b in build_rows:
+                        if build_getter(b) not in matched:
+                            yield result(None, b)
+                if profile is not None:
+                    profile.release(self)
+        finally:
+            if profile is not None:
+                profile.release(self)
+
+
+class ChunkEnumerable(Enumerable):
+    """
+    Class to hold state for splitting a collection into fixed size chunks
+    """
+
+    def __init__(self, enumerable, n):
+        super(ChunkEnumerable, self).__init__(enumerable)
+        self.n = n
+
+    def __iter__(self):
+        iterator = iter(self.data)
+        chunk = list(itertools.islice(iterator, self.n))
+        while chunk:
+            yield chunk
+            chunk = list(itertools.islice(iterator, self.n))
+
+    def __len__(self):
+        return sum(1 for c in self)
+
+
+class SampleEnumerable(Enumerable):
+    """
+    Class to hold state for a reservoir sample of a collection
+    """
+
+    def __init__(self, enumerable, k, seed):
+        super(SampleEnumerable, self).__init__(enumerable)
+        self.k = k
+        self.seed = seed
+
+    def __iter__(self):
+        return iter(sketches.reservoir_sample(self.data, self.k, self.seed))
+
+
+class SampleFractionEnumerable(Enumerable):
+    """
+    Class to hold state for a Bernoulli sample of a collection
+    """
+
+    def __init__(self, enumerable, p, seed):
+        super(SampleFractionEnumerable, self).__init__(enumerable)
+        self.p = p
+        self.seed = seed
+
+    def __iter__(self):
+        return sketches.bernoulli_sample(self.data, self.p, self.seed)
+
+
+class WindowEnumerable(Enumerable):
+    """
+    Class to hold state for sliding a window over a collection
+    """
+
+    def __init__(self, enumerable, size, step):
+        super(WindowEnumerable, self).__init__(enumerable)
+        self.size = size
+        self.step = step
+
+    def __iter__(self):
+        iterator = iter(self.data)
+        # ring buffer shared between windows: advancing by step only appends
+        # step elements, the oldest ones fall off the front
+        window = deque(itertools.islice(iterator, self.size), maxlen=self.size)
+        if len(window) < self.size:
+            return
+        yield tuple(window)
+        while True:
+            added = 0
+            for element in itertools.islice(iterator, self.step):
+                window.append(element)
+                added += 1
+            if added < self.step:
+                return
+            yield tuple(window)
+
+    def __len__(self):
+        return sum(1 for w in self)
+
+
+class EventWindowEnumerable(Enumerable):
+    """
+    Class to hold state for grouping a collection into windows of event time
+    """
+
+    def __init__(self, enumerable, ts_func, size, slide, allowed_lateness, aggregates):
+        super(EventWindowEnumerable, self).__init__(enumerable)
+        self.ts_func = ts_func
+        self.size = size
+        self.slide = slide
+        self.allowed_lateness = allowed_lateness
+        self.names = list(aggregates)
+        self.aggregates = [aggregates[name] for name in self.names]
+
+    def _result(self, n, state):
+        start = n * self.slide
+        key = Key({"start": start, "end": start + self.size})
+        if not self.aggregates:
+            return Grouping(key, state)
+        result = dict(
+            (name, a.result(s))
+            for name, a, s in zip(self.names, self.aggregates, state)
+        )
+        result["key"] = key
+        return Key(result)
+
+    def __iter__(self):
+        size, slide = self.size, self.slide
+        aggregates = self.aggregates
+        # state of the open windows by window number, and a heap of their
+        # numbers so that they close in order
+        windows = dict()
+        open_windows = []
+        watermark = None
+        for element in self.data:
+            ts = self.ts_func(element)
+            for n in range(int((ts - size) // slide) + 1, int(ts // slide) + 1):
+                if watermark is not None and n * slide + size <= watermark:
+                    # the window is already closed
+                    continue
+                state = windows.get(n)
+                if state is None:
+                    state = windows[n] = [a.initial() for a in aggregates]
+                    heapq.heappush(open_windows, n)
+                if aggregates:
+                    for i, a in enumerate(aggregates):
+                        state[i] = a.step(state[i], element)
+                else:
+                    state.append(element)
+            mark = ts - self.allowed_lateness
+            if watermark is None or mark > watermark:
+                watermark = mark
+                while open_windows and open_windows[0] * slide + size <= watermark:
+                    n = heapq.heappop(open_windows)
+                    yield self._result(n, windows.pop(n))
+        while open_windows:
+            n = heapq.heappop(open_windows)
+            yield self._result(n, windows.pop(n))
+
+    def __len__(self):
+        return sum(1 for w in self)
+
+
+class PartitionedEnumerable(Enumerable):
+    """
+    Class to hold state for running key based operators in worker processes
+    """
+
+    def __init__(self, enumerable, workers=None):
+        super(PartitionedEnumerable, self).__init__(enumerable)
+        self.workers = workers
+
+    def _run(self, task, *inputs):
+        workers = self.workers or parallel.default_workers()
+        return Enumerable(parallel.PartitionedJob(task, list(inputs), workers))
+
+    def _check(self, enumerable):
+        if not isinstance(enumerable, Enumerable):
+            raise TypeError(u"enumerable parameter must be an instance of Enumerable")
+
+    def where(self, predicate):
+        """
+        Filters elements. The result is still partitioned
+        :param predicate: predicate as a lambda expression
+        :return: new PartitionedEnumerable object
+        """
+        return PartitionedEnumerable(
+            super(PartitionedEnumerable, self).where(predicate), self.workers
+        )
+
+    def select(self, func=lambda x: x):
+        """
+        Transforms elements. The result is still partitioned
+        :param func: lambda expression on how to perform transformation
+        :return: new PartitionedEnumerable object
+        """
+        return PartitionedEnumerable(
+            super(PartitionedEnumerable, self).select(func), self.workers
+        )
+
+    def select_many(self, func=lambda x: x):
+        """
+        Flattens an iterable of iterables. The result is still partitioned
+        :param func: selector as lambda expression
+        :return: new PartitionedEnumerable object
+        """
+        return PartitionedEnumerable(
+            super(PartitionedEnumerable, self).select_many(func), self.workers
+        )
+
+    def group_by(
+        self, key_names=[], key=lambda x: x, result_func=lambda x: x, max_in_memory=None
+    ):
+        """
+        Groups elements by key. Each worker groups the elements of its
+        partition, so every group is complete within one worker
+        :param key_names: names of the key values
+        :param key: key selector as lambda expression or key path
+        :param result_func: lambda expression to transform each grouping
+        :param max_in_memory: maximum number of elements each worker groups in
+        memory
+        :return: new Enumerable object
+        """
+        key = selector(key)
+
+        def task(rows):
+            return Enumerable(rows).group_by(key_names, key, result_func, max_in_memory)
+
+        return self._run(task, (self.data, key))
+
+    def aggregate_by(
+        self, key_names=[], key=lambda x: x, result_func=lambda x: x, **aggregates
+    ):
+        """
+        Aggregates the elements of each key. Each worker aggregates the keys
+        of its partition
+        :param key_names: names of the key values
+        :param key: key selector as lambda expression or key path
+        :param result_func: lambda expression to transform each result
+        :param aggregates: Aggregate instances by result name
+        :return: new Enumerable object
+        """
+        key = selector(key)
+        # validates the aggregates before any work is done
+        Enumerable().aggregate_by(key_names, key, result_func, **aggregates)
+
+        def task(rows):
+            return Enumerable(rows).aggregate_by(
+                key_names, key, result_func, **aggregates
+            )
+
+        return self._run(task, (self.data, key))
+
+    def distinct(self, key=lambda x: x, max_keys=None, evict=False):
+        """
+        Distinct elements by key. max_keys limits the keys of each worker
+        """
+        key = selector(key)
+        if max_keys is not None and max_keys < 1:
+            raise ValueError(u"max_keys must be a positive integer")
+
+        def task(rows):
+            return Enumerable(rows).distinct(key, max_keys, evict)
+
+        return self._run(task, (self.data, key))
+
+    def approx_count_distinct(self, key=lambda x: x, precision=14):
+        """
+        Estimates the number of distinct keys. Each worker builds a
+        HyperLogLog sketch of its partition and the sketches are merged
+        :param key: key selector as lambda expression or key path
+        :param precision: number of HyperLogLog index bits, between 4 and 16
+        :return: estimated number of distinct keys as int
+        """
+        key = selector(key)
+        sketch = sketches.HyperLogLog(precision)
+
+        def task(rows):
+            return [Enumerable(rows)._distinct_sketch(key, precision)]
+
+        for partial in self._run(task, (self.data, key)):
+            sketch.merge(partial)
+        return sketch.count()
+
+    def approx_quantile(self, q, func=lambda x: x, k=200, seed=None):
+        """
+        Estimates the value at the given quantile. Each worker builds a KLL
+        sketch of its partition and the sketches are merged
+        :param q: quantile between 0 and 1. 0.5 estimates the median
+        :param func: lambda expression to project data. Projected values must
+        be json serializable
+        :param k: sketch accuracy parameter
+        :param seed: seed for the sketches, for reproducible results
+        :return: estimated value at quantile q
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(u"q must be between 0 and 1")
+        func = selector(func)
+        sketch = sketches.QuantileSketch(k, seed)
+
+        def task(rows):
+            return [Enumerable(rows)._quantile_sketch(func, k, seed)]
+
+        for partial in self._run(task, (self.data, func)):
+            sketch.merge(partial)
+        if sketch.n == 0:
+            raise NoElementsError(u"Iterable contains no elements")
+        return sketch.quantile(q)
+
+    def union(self, enumerable, key=lambda x: x):
+        """
+        Union of elements by key. Each worker unites the elements of both
+        inputs in its partition
+        :param enumerable: enumerable to union self to
+        :param key: key selector used to determine uniqueness
+        :return: new Enumerable object
+        """
+        self._check(enumerable)
+        key = selector(key)
+
+        def task(rows, others):
+            return Enumerable(rows).union(Enumerable(others), key)
+
+        return self._run(task, (self.data, key), (enumerable, key))
+
+    def intersect(self, enumerable, key=lambda x: x):
+        """
+        Elements of self whose keys are in enumerable. Each worker intersects
+        the elements of both inputs in its partition
+        :param enumerable: enumerable object
+        :param key: key selector as lambda expression or key path
+        :return: new Enumerable object
+        """
+        self._check(enumerable)
+        key = selector(key)
+
+        def task(rows, others):
+            return Enumerable(rows).intersect(Enumerable(list(others)), key)
+
+        return self._run(task, (self.data, key), (enumerable, key))
+
+    def except_(self, enumerable, key=lambda x: x):
+        """
+        Elements of self whose keys are not in enumerable. Each worker
+        subtracts the elements of both inputs in its partition
+        :param enumerable: enumerable object
+        :param key: key selector as lambda expression or key path
+        :return: new Enumerable object
+        """
+        self._check(enumerable)
+        key = selector(key)
+
+        def task(rows, others):
+            return Enumerable(rows).except_(Enumerable(list(others)), key)
+
+        return self._run(task, (self.data, key), (enumerable, key))
+
+    def join(
+        self,
+        inner_enumerable,
+        outer_key=lambda x: x,
+        inner_key=lambda x: x,
+        result_func=lambda x: x,
+        max_in_memory=None,
+    ):
+        """
+        Joins each pair of partitions with a hash join
+        """
+        self._check(inner_enumerable)
+        outer_key = selector(outer_key)
+        inner_key = selector(inner_key)
+
+        def task(outer, inner):
+            inner = list(inner)
+            return Enumerable(outer).join(
+                Enumerable(inner),
+                outer_key,
+                inner_key,
+                result_func,
+                max_in_memory or max(1, len(inner)),
+            )
+
+        return self._run(task, (self.data, outer_key), (inner_enumerable, inner_key))
+
+    def group_join(
+        self,
+        inner_enumerable,
+        outer_key=lambda x: x,
+        inner_key=lambda x: x,
+        result_func=lambda x: x,
+        max_in_memory=None,
+    ):
+        """
+        Joins each pair of partitions with a hash join
+        """
+        self._check(inner_enumerable)
+        outer_key = selector(outer_key)
+        inner_key = selector(inner_key)
+
+        def task(outer, inner):
+            inner = list(inner)
+            return Enumerable(outer).group_join(
+                Enumerable(inner),
+                outer_key,
+                inner_key,
+                result_func,
+                max_in_memory or max(1, len(inner)),
+            )
+
+        return self._run(task, (self.data, outer_key), (inner_enumerable, inner_key))
+
+
+class PrefetchEnumerable(Enumerable):
+    """
+    Class to hold state for reading a collection on a background thread
+    """
+
+    def __init__(self, enumerable, buffer_size):
+        super(PrefetchEnumerable, self).__init__(enumerable)
+        self.buffer_size = buffer_size
+
+    def __iter__(self):
+        return readahead.read_ahead(self.data, self.buffer_size)
+
+
+class SelectBatchEnumerable(Enumerable):
+    """
+    Class to hold state for projection of elements a batch at a time
+    """
+
+    def __init__(self, enumerable, func, batch_size, target_latency=None):
+        super(SelectBatchEnumerable, self).__init__(enumerable)
+        self.func = func
+        self.batch_size = batch_size
+        self.target_latency = target_latency
+
+    def __iter__(self):
+        iterator = iter(self.data)
+        batch_size = self.batch_size
+        while True:
+            batch = list(itertools.islice(iterator, batch_size))
+            if not batch:
+                return
+            start = time.perf_counter()
+            results = self.func(batch)
+            elapsed = time.perf_counter() - start
+            if len(results) != len(batch):
+                raise ValueError(
+                    u"select_batch function returned {0} results for {1} "
+                    u"elements".format(len(results), len(batch))
+                )
+            for result in results:
+                yield result
+            if self.target_latency is not None and len(batch) == batch_size:
+                batch_size = self._next_batch_size(batch_size, elapsed)
+
+    def _next_batch_size(self, batch_size, elapsed):
+        # scale towards the target latency, at most doubling or halving per
+        # batch so a single slow or fast call does not swing the size
+        if elapsed <= 0:
+            return batch_size * 2
+        scaled = int(batch_size * self.target_latency / elapsed)
+        return max(1, batch_size // 2, min(batch_size * 2, scaled))
+
+    def __len__(self):
+        return len(self.data)
+
+
+class AssumedSortedEnumerable(Enumerable):
+    """
+    Class to hold state for an enumerable declared to be sorted by a key
+    """
+
+    def __init__(self, enumerable, key, descending=False):
+        super(AssumedSortedEnumerable, self).__init__(enumerable)
+        self.sort_order = (key, descending)
+
+
+class MergeJoinEnumerable(JoinEnumerable):
+    """
+    Class to hold state for a merge join of 2 enumerables sorted by their
+    join keys. Only inner elements with the current key are held in memory
+    """
+
+    def __init__(
+        self,
+        outer_enumerable,
+        inner_enumerable,
+        outer_key,
+        inner_key,
+        result_func,
+        descending=False,
+    ):
+        super(MergeJoinEnumerable, self).__init__(
+            outer_enumerable, inner_enumerable, outer_key, inner_key, result_func
+        )
+        self.descending = descending
+
+    def __iter__(self):
+        before = _before(self.descending)
+        inner = iter(self.inner_enumerable)
+        pending = next(inner, _END)
+        inner_key = self.inner_key
+        if pending is not _END:
+            inner_key = resolve(inner_key, pending)
+        pending_key = inner_key(pending) if pending is not _END else None
+        run_key = _END
+        run = []
+        outer_key, data = resolve_first(self.outer_key, self.data)
+        for o in data:
+            ok = outer_key(o)
+            if run_key is _END or ok != run_key:
+                while pending is not _END and before(pending_key, ok):
+                    pending = next(inner, _END)
+                    if pending is not _END:
+                        pending_key = inner_key(pending)
+                run_key = ok
+                run = []
+                while pending is not _END and pending_key == ok:
+                    run.append(pending)
+                    pending = next(inner, _END)
+                    if pending is not _END:
+                        pending_key = inner_key(pending)
+            for i in run:
+                yield self.result_func((o, i))
+
+
+class MergeIntersectEnumerable(IntersectEnumerable):
+    """
+    Class to hold state for intersecting 2 enumerables sorted by key in a
+    single pass
+    """
+
+    def __init__(self, enumerable1, enumerable2, key, descending=False):
+        super(MergeIntersectEnumerable, self).__init__(enumerable1, enumerable2, key)
+        self.descending = descending
+        self.sort_order = (key, descending)
+
+    def _matches(self):
+        """
+        :return: generator of (element, True if enumerable2 has its key)
+        """
+        before = _before(self.descending)
+        others = iter(self.enumerable)
+        other = next(others, _END)
+        key, data = resolve_first(self.key, self.data)
+        other_getter = resolve(self.key, other) if other is not _END else None
+        other_key = other_getter(other) if other is not _END else None
+        for element in data:
+            k = key(element)
+            while other is not _END and before(other_key, k):
+                other = next(others, _END)
+                if other is not _END:
+                    other_key = other_getter(other)
+            yield element, other is not _END and other_key == k
+
+    def __iter__(self):
+        for element, found in self._matches():
+            if found:
+                yield element
+
+
+class MergeExceptEnumerable(MergeIntersectEnumerable):
+    """
+    Class to hold state for subtracting an enumerable from another, both
+    sorted by key, in a single pass
+    """
+
+    def __iter__(self):
+        for element, found in self._matches():
+            if not found:
+                yield element
+
+
+class MergeSortedEnumerable(Enumerable):
+    """
+    Class to hold state for a lazy k-way merge of sorted enumerables
+    """
+
+    def __init__(self, sources, key, descending=False):
+        super(MergeSortedEnumerable, self).__init__(sources)
+        self.key = key
+        self.descending = descending
+        self.sort_order = (key, descending)
+        self._cycle = None
+
+    def next(self):
+        if self._cycle is None:
+            self._cycle = itertools.cycle(self)
+        return next(self._cycle)
+
+    def __iter__(self):
+        return heapq.merge(*self.data, key=self.key, reverse=self.descending)
+
+    def __len__(self):
+        return sum(len(source) for source in self.data)
+
+
+class MergeUnionEnumerable(Enumerable):
+    """
+    Class to hold state for the union of 2 enumerables sorted by key, without
+    a set of the keys seen. The elements are in the order of the unsorted
+    union: the first element of each key of enumerable1, then those of
+    enumerable2 whose keys are not in enumerable1. enumerable1 is read twice
+    """
+
+    def __init__(self, enumerable1, enumerable2, key, descending=False):
+        super(MergeUnionEnumerable, self).__init__(enumerable1)
+        self.enumerable = enumerable2
+        self.key = key
+        self.descending = descending
+
+    def __iter__(self):
+        others = MergeExceptEnumerable(
+            self.enumerable, self.data, self.key, self.descending
+        )
+        for data in (self.data, others):
+            last = _END
+            key, data = resolve_first(self.key, data)
+            for element in data:
+                k = key(element)
+                if last is _END or k != last:
+                    last = k
+                    yield element
+
+    def __len__(self):
+        return sum(1 for e in self)
+
+
+class StructEnumerable(Enumerable):
+    """
+    Class to hold state for a sequence of binary records in a buffer. Skipping
+    and taking records slices the buffer instead of reading records
+    """
+
+    def __init__(self, record_buffer):
+        super(StructEnumerable, self).__init__(record_buffer)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def count(self, predicate=None):
+        if predicate is None:
+            return len(self.data)
+        return super(StructEnumerable, self).count(predicate)
+
+    def skip(self, n):
+        return StructEnumerable(self.data.slice(max(n, 0)))
+
+    def take(self, n):
+        return StructEnumerable(self.data.slice(0, max(n, 0)))
+
+    def element_at(self, n):
+        if not isinstance(n, int):
+            raise TypeError("Must be an integer")
+        if n < 0:
+            raise IndexError
+        return self.data[n]
+
+    def element_at_or_default(self, n):
+        try:
+            return self.element_at(n)
+        except IndexError:
+            return None
+
+    def __getitem__(self, n):
+        return self.element_at_or_default(n)
+
+    def column(self, field):
+        """
+        Gets the values of a numeric field of all records. If the byte order,
+        size and alignment of the field match the native layout, the values
+        are a zero-copy memoryview of the buffer. Otherwise they are unpacked
+        into a list
+        :param field: field name or index of the value in a record
+        :return: memoryview or list of values
+        """
+        return self.data.column(field)
+
+
+class CompiledEnumerable(Enumerable):
+    """
+    Class to hold state for a compiled chain of streaming operators
+    """
+
+    def __init__(self, enumerable, function, args):
+        super(CompiledEnumerable, self).__init__(enumerable)
+        self.function = function
+        self.args = args
+
+    def __iter__(self):
+        return self.function(self.data, *self.args)
+
+    def __len__(self):
+        return sum(1 for e in self)
+
+
+class AppendableEnumerable(Enumerable):
+    """
+    Class to hold state for a collection that elements are appended to
+    """
+
+    def __init__(self, data):
+        super(AppendableEnumerable, self).__init__(data)
+
+    def push(self, element):
+        """
+        Appends an element in place
+        :param element: An element
+        :return: self
+        """
+        self._data.append(element)
+        return self
+
+    def extend(self, iterable):
+        """
+        Appends the elements of an iterable in place
+        :param iterable: iterable object
+        :return: self
+        """
+        self._data.extend(iterable)
+        return self
+
+    def __len__(self):
+        return len(self._data)
+
+
+class IncrementalView(Enumerable):
+    """
+    Class to hold state for a query result that is maintained as elements
+    are appended to its source
+    """
+
+    _STAGES = ("select", "where", "select_many")
+
+    def __init__(self, enumerable, aggregates):
+        super(IncrementalView, self).__init__(enumerable)
+        self.names = list(aggregates)
+        self.aggregates = [aggregates[name] for name in self.names]
+        node = enumerable
+        self.operator = None
+        if not aggregates and type(node) in (
+            DistinctEnumerable,
+            GroupedEnumerable,
+            AggregateEnumerable,
+        ):
+            if type(node) is DistinctEnumerable and node.max_keys is not None:
+                raise TypeError(u"distinct with max_keys cannot be maintained")
+            self.operator = node
+            node = node.data
+        source, steps = compiler.plan(node, _STREAMING_STAGES)
+        unsupported = [kind for kind, arg in steps if kind not in self._STAGES]
+        if unsupported or not isinstance(source, AppendableEnumerable):
+            raise TypeError(
+                u"Only select, where and select_many over an appendable "
+                u"Enumerable can be maintained incrementally"
+            )
+        self.source = source
+        self.function = compiler.pipeline_function(tuple(k for k, a in steps))
+        self.args = [arg for kind, arg in steps]
+        self._offset = 0
+        self._elements = []
+        self._keys = set()
+        self._groups = dict()
+        self._states = [a.initial() for a in self.aggregates]
+        self.refresh()
+
+    def refresh(self):
+        """
+        Updates the view with the elements appended to the source since the
+        last refresh
+        :return: self
+        """
+        data = self.source.data
+        if len(data) == self._offset:
+            return self
+        appended = data[self._offset:]
+        self._offset += len(appended)
+        elements = self.function(appended, *self.args)
+        operator = self.operator
+        if self.aggregates:
+            states = self._states
+            for element in elements:
+                for i, a in enumerate(self.aggregates):
+                    states[i] = a.step(states[i], element)
+        elif operator is None:
+            self._elements.extend(elements)
+        elif type(operator) is DistinctEnumerable:
+            keys = self._keys
+            for element in elements:
+                k = operator.key(element)
+                if k not in keys:
+                    keys.add(k)
+                    self._elements.append(element)
+        elif type(operator) is AggregateEnumerable:
+            operator._accumulate(self._groups, elements)
+        else:
+            operator._load_data(elements, self._groups)
+        return self
+
+    def __iter__(self):
+        self.refresh()
+        operator = self.operator
+        if self.aggregates:
+            yield Key(
+                dict(
+                    (name, a.result(state))
+                    for name, a, state in zip(self.names, self.aggregates, self._states)
+                )
+            )
+        elif operator is None or type(operator) is DistinctEnumerable:
+            for element in self._elements:
+                yield element
+        elif type(operator) is AggregateEnumerable:
+            for result in operator._results(self._groups):
+                yield result
+        else:
+            for grouping in list(self._groups.values()):
+                yield operator.func(grouping)
+
+    def __len__(self):
+        return sum(1 for e in self)
+
+
+_STREAMING_STAGES = {
+    SelectEnumerable: ("select", "func"),
+    WhereEnumerable: ("where", "predicate"),
+    SelectManyEnumerable: ("select_many", "selector"),
+    SkipEnumerable: ("skip", "n"),
+    TakeEnumerable: ("take", "n"),
+    SkipWhileEnumerable: ("skip_while", "predicate"),
+    TakeWhileEnumerable: ("take_while", "predicate"),
+}
+
+
+# operators whose output keeps the order of their input
+_ORDER_PRESERVING = (
+    WhereEnumerable,
+    SkipEnumerable,
+    TakeEnumerable,
+    SkipWhileEnumerable,
+    TakeWhileEnumerable,
+    DistinctEnumerable,
+)
+
+_END = object()
+
+
+def _can_enumerate(key_value):
+    return hasattr(key_value, "__len__") and len(key_value) > 0
+
+
+def _group_key(key_names, key_value):
+    """
+    :return: Key of a group, with one key value per key name
+    """
+    cls = key_class(key_names)
+    if _can_enumerate(key_value):
+        return cls._make(key_value[i] for i in range(len(cls._fields)))
+    return cls._make(key_value for name in cls._fields)
+
+
+def _group_key_hash(key_value):
+    return hash(json.dumps(key_value))
+
+
+def _sort_order(enumerable):
+    """
+    :return: (key, descending) the enumerable is known to be sorted by, or
+    None
+    """
+    while isinstance(enumerable, _ORDER_PRESERVING):
+        enumerable = enumerable.data
+    return getattr(enumerable, "sort_order", None)
+
+
+def _sorted_by(enumerable, key):
+    """
+    :return: True if the enumerable is sorted by key in descending order,
+    False if in ascending order, None if it is not known to be sorted by key
+    """
+    order = _sort_order(enumerable)
+    if order is None or not same_key(order[0], key):
+        return None
+    return order[1]
+
+
+def _merge_order(enumerable1, key1, enumerable2, key2):
+    """
+    :return: the direction both enumerables are sorted in by their keys, or
+    None if they cannot be merged
+    """
+    descending = _sorted_by(enumerable1, key1)
+    if descending is None or _sorted_by(enumerable2, key2) != descending:
+        return None
+    return descending
+
+
+def _before(descending):
+    if descending:
+        return lambda a, b: b < a
+    return lambda a, b: a < b
+
+
+def _indexable(enumerable):
+    """
+    :return: the sorted list or tuple holding the elements of the enumerable,
+    or None if its elements cannot be read by index
+    """
+    while True:
+        if isinstance(enumerable, (list, tuple, range)):
+            return enumerable
+        if isinstance(enumerable, SortedEnumerable):
+            if enumerable._max_in_memory is not None:
+                return None
+        elif type(enumerable) not in (Enumerable, AssumedSortedEnumerable):
+            return None
+        enumerable = enumerable.data
+
+
+def _bisect_left(items, value, key, descending):
+    before = _before(descending)
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if before(key(items[mid]), value):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
@@ -0,0 +1,150 @@
+"""
+Read-ahead of an iterable on a background thread. The thread appends elements
+to a bounded deque while the consumer processes the elements already read,
+so waiting on I/O in the source overlaps with computing on the results.
+"""
+
+import collections
+import threading
+
+from .memory import active_profile
+
+# number of elements after which a waiting consumer is woken. Waking it for
+# every element would make the threads take turns for each one
+MAX_BATCH_SIZE = 256
+# seconds after which a waiting consumer checks for fewer elements, so that
+# elements read before the source blocks are not held back
+POLL_INTERVAL = 0.002
+
+_END = object()
+
+
+class _State(object):
+    # plain attributes instead of events, so that both threads can check them
+    # for every element without taking the lock. Appending to and popping
+    # from a deque are atomic, so only waiting needs the condition
+    __slots__ = (
+        "items",
+        "condition",
+        "limit",
+        "batch_size",
+        "stop",
+        "waiting",
+        "full",
+        "error",
+    )
+
+    def __init__(self, limit):
+        self.items = collections.deque()
+        self.condition = threading.Condition()
+        self.limit = limit
+        self.batch_size = max(1, min(MAX_BATCH_SIZE, limit // 2))
+        self.stop = False
+        self.waiting = False
+        self.full = False
+        self.error = None
+
+    def notify(self):
+        with self.condition:
+            self.condition.notify()
+
+
+def _produce(iterable, state, profile):
+    if profile is None:
+        _read(iterable, state)
+        return
+    # the source belongs to the query of the consumer thread
+    with profile:
+        _read(iterable, state)
+
+
+def _read(iterable, state):
+    iterator = iter(iterable)
+    items = state.items
+    limit = state.limit
+    batch_size = state.batch_size
+    try:
+        for element in iterator:
+            if state.stop:
+                return
+            # every element is visible to the consumer as soon as it is read,
+            # so none are held back while the source blocks
+            items.append(element)
+            if state.waiting and len(items) >= batch_size:
+                state.waiting = False
+                state.notify()
+            if len(items) >= limit:
+                _wait_for_room(state)
+    except BaseException as e:
+        state.error = e
+    finally:
+        items.append(_END)
+        state.notify()
+        # generators must be closed by the thread that runs them
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+def _wait_for_room(state):
+    # resume once the consumer has taken half of the elements, instead of
+    # switching threads for each one
+    low = state.limit // 2
+    with state.condition:
+        while True:
+            # set before checking, so that the consumer either sees it or
+            # has already taken the elements
+            state.full = True
+            if len(state.items) <= low or state.stop:
+                break
+            state.condition.wait()
+        state.full = False
+
+
+def read_ahead(iterable, buffer_size):
+    """
+    Iterates an iterable on a background thread. At most buffer_size
+    elements are read ahead of the consumer. An exception raised by the
+    iterable is raised to the consumer after the elements read before it.
+    When the generator is closed or garbage collected before the end, the
+    iterable is closed and the thread is joined
+    :param iterable: the elements to read
+    :param buffer_size: number of elements to read ahead
+    :return: generator of the elements
+    """
+    state = _State(buffer_size)
+    items = state.items
+    low = buffer_size // 2
+    thread = threading.Thread(
+        target=_produce,
+        args=(iterable, state, active_profile()),
+        name="py_linq prefetch",
+    )
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            try:
+                element = items.popleft()
+            except IndexError:
+                with state.condition:
+                    while not items:
+                        state.waiting = True
+                        state.condition.wait(POLL_INTERVAL)
+                    state.waiting = False
+                continue
+            if element is _END:
+                if state.error is not None:
+                    raise state.error
+                return
+            if state.full and len(items) <= low:
+                state.full = False
+                state.notify()
+            yield element
+    finally:
+        state.stop = True
+        # wake the thread if it waits for room, after which it sees the stop
+        # flag
+        with state.condition:
+            state.condition.notify()
+        thread.join()
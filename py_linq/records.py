@@ -0,0 +1,163 @@
+"""
+Lazy views over buffers of fixed-size binary records, such as memory-mapped
+files. Records are only unpacked when they are read, slicing a view is offset
+arithmetic, and numeric fields can be read as memoryview casts of the
+underlying buffer without copying.
+"""
+
+import mmap
+import struct
+import sys
+from collections import namedtuple
+
+_BYTE_ORDERS = {"<": "little", ">": "big", "!": "big", "=": sys.byteorder}
+_STRING_CODES = "sp"
+_VIEW_CODES = "bBhHiIlLqQnNefd?"
+
+
+def parse_format(struct_format):
+    """
+    Finds the value of each unpacked item of a struct format
+    :param struct_format: struct format string
+    :return: list of (format character, byte offset) tuples, one per value
+    """
+    prefix = struct_format[:1] if struct_format[:1] in "@=<>!" else ""
+    body = struct_format[len(prefix):].replace(" ", "")
+    items = []
+    consumed = ""
+    i = 0
+    while i < len(body):
+        j = i
+        while body[j].isdigit():
+            j += 1
+        count = int(body[i:j]) if j > i else 1
+        code = body[j]
+        if code in _STRING_CODES:
+            offset = struct.calcsize(prefix + consumed + "0" + code)
+            items.append((code, offset))
+        elif code != "x":
+            for n in range(count):
+                offset = struct.calcsize(prefix + consumed + "{0}{1}".format(n, code))
+                items.append((code, offset))
+        consumed += body[i:j + 1]
+        i = j + 1
+    return items
+
+
+class RecordBuffer(object):
+    """
+    Sequence of the records in a slice of a buffer
+    """
+
+    def __init__(self, buffer, struct_format, fields=None, start=0, stop=None):
+        """
+        Constructor
+        :param buffer: object supporting the buffer protocol
+        :param struct_format: struct format string of one record
+        :param fields: names of the values of a record. None to return records
+        as tuples
+        :param start: index of the first record
+        :param stop: index after the last record. None for the end of buffer
+        """
+        self.struct_format = struct_format
+        self.struct = struct.Struct(struct_format)
+        self.buffer = memoryview(buffer).cast("B")
+        size = self.struct.size
+        if size == 0 or len(self.buffer) % size:
+            raise ValueError(
+                u"Buffer of {0} bytes does not hold whole records of {1} "
+                u"bytes".format(len(self.buffer), size)
+            )
+        self.items = parse_format(struct_format)
+        self.fields = None if fields is None else tuple(fields)
+        if self.fields is not None and len(self.fields) != len(self.items):
+            raise ValueError(
+                u"{0} field names given for {1} values".format(
+                    len(self.fields), len(self.items)
+                )
+            )
+        self.record = namedtuple("Record", self.fields) if fields is not None else None
+        count = len(self.buffer) // size
+        self.start, self.stop, step = slice(start, stop).indices(count)
+        self.stop = max(self.start, self.stop)
+
+    def _view(self):
+        size = self.struct.size
+        return self.buffer[self.start * size:self.stop * size]
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        records = self.struct.iter_unpack(self._view())
+        if self.record is None:
+            return records
+        return map(self.record._make, records)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(u"Record index out of range")
+        values = self.struct.unpack_from(
+            self.buffer, (self.start + i) * self.struct.size
+        )
+        return values if self.record is None else self.record._make(values)
+
+    def slice(self, start, stop=None):
+        """
+        :return: RecordBuffer of the records from start to stop of this one
+        """
+        start, stop, step = slice(start, stop).indices(len(self))
+        return RecordBuffer(
+            self.buffer,
+            self.struct_format,
+            self.fields,
+            self.start + start,
+            self.start + max(start, stop),
+        )
+
+    def column(self, field):
+        """
+        Gets the values of a numeric field of all records. If the byte order,
+        size and alignment of the field match the native layout, the values
+        are a memoryview cast of the buffer and nothing is copied. Otherwise
+        they are unpacked into a list
+        :param field: field name or index of the value in a record
+        :return: memoryview or list of values
+        """
+        index = self.fields.index(field) if isinstance(field, str) else field
+        code, offset = self.items[index]
+        view = self._native_view(code, offset)
+        if view is not None:
+            return view
+        return [values[index] for values in self.struct.iter_unpack(self._view())]
+
+    def _native_view(self, code, offset):
+        fmt = self.struct_format
+        prefix = fmt[:1] if fmt[:1] in "@=<>!" else "@"
+        byte_order = _BYTE_ORDERS.get(prefix, sys.byteorder)
+        if code not in _VIEW_CODES or byte_order != sys.byteorder:
+            return None
+        itemsize = struct.calcsize("@" + code)
+        if struct.calcsize(prefix + code) != itemsize:
+            return None
+        size = self.struct.size
+        if size % itemsize or offset % itemsize:
+            return None
+        step = size // itemsize
+        values = self._view().cast(code)
+        return values[offset // itemsize::step]
+
+
+def map_file(path):
+    """
+    Memory maps a file for reading
+    :param path: path to the file
+    :return: mmap object, or empty bytes for an empty file
+    """
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        if f.tell() == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
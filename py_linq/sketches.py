@@ -0,0 +1,269 @@
+"""
+Fixed memory, single pass sketches used by the approximate aggregates of
+Enumerable. Sketches of the same configuration can be merged, so partial
+sketches built over partitions of a collection combine into the sketch of the
+whole collection. Also holds the random samplers of Enumerable.
+"""
+import itertools
+import math
+import random
+from operator import itemgetter
+
+from .core import stable_hash
+
+_MASK64 = (1 << 64) - 1
+_END = object()
+
+
+class HyperLogLog(object):
+    """
+    HyperLogLog cardinality estimator.
+
+    The relative standard error of count() is about 1.04 / sqrt(2 ** precision),
+    e.g. 0.81% for the default precision of 14, which uses 16 KB of registers.
+    """
+
+    def __init__(self, precision=14):
+        """
+        Constructor
+        :param precision: number of index bits, between 4 and 16
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError(u"precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def standard_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, value):
+        """
+        Adds a value to the sketch
+        :param value: a json serializable value
+        """
+        self.add_hash(stable_hash(value))
+
+    def update(self, values):
+        """
+        Adds all values of an iterable to the sketch
+        :param values: iterable of json serializable values
+        :return: self
+        """
+        registers = self.registers
+        shift = 64 - self.precision
+        low = (1 << shift) - 1
+        for value in values:
+            h = stable_hash(value)
+            # rank of the leftmost 1 bit after the index bits
+            rank = shift + 1 - (h & low).bit_length()
+            index = h >> shift
+            if rank > registers[index]:
+                registers[index] = rank
+        return self
+
+    def add_hash(self, h):
+        """
+        Adds a precomputed 64 bit hash to the sketch
+        :param h: integer in [0, 2 ** 64)
+        """
+        p = self.precision
+        index = h >> (64 - p)
+        w = (h << p) & _MASK64
+        rank = 64 - w.bit_length() + 1 if w else 64 - p + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """
+        Merges another sketch into this one
+        :param other: HyperLogLog instance with the same precision
+        :return: self
+        """
+        if other.precision != self.precision:
+            raise ValueError(u"Cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """
+        Estimates the number of distinct values added to the sketch
+        :return: integer estimate
+        """
+        m = len(self.registers)
+        if m >= 128:
+            alpha = 0.7213 / (1.0 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(float(m) / zeros)
+        return int(round(estimate))
+
+
+class QuantileSketch(object):
+    """
+    KLL quantile sketch.
+
+    Keeps O(k log(n / k)) items. The rank of the value returned by quantile(q)
+    is within about 1.7 / k * n of q * n with high probability, e.g. 0.85% of n
+    for the default k of 200.
+    """
+
+    def __init__(self, k=200, seed=None):
+        """
+        Constructor
+        :param k: accuracy parameter. Larger is more accurate and uses more memory
+        :param seed: seed for the random compaction offsets
+        """
+        if k < 8:
+            raise ValueError(u"k must be at least 8")
+        self.k = k
+        self.n = 0
+        self.compactors = []
+        self._random = random.Random(seed)
+        self._size = 0
+        self._max_size = 0
+        self._grow()
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * (2.0 / 3.0) ** depth)) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self):
+        for h, compactor in enumerate(self.compactors):
+            if len(compactor) < self._capacity(h):
+                continue
+            if h + 1 >= len(self.compactors):
+                self._grow()
+            compactor.sort()
+            leftover = [compactor.pop()] if len(compactor) % 2 else []
+            offset = self._random.randint(0, 1)
+            self.compactors[h + 1].extend(compactor[offset::2])
+            self.compactors[h] = leftover
+            self._size = sum(len(c) for c in self.compactors)
+            break
+
+    def add(self, value):
+        """
+        Adds a value to the sketch
+        :param value: a value that is comparable with the other values
+        """
+        self.compactors[0].append(value)
+        self.n += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other):
+        """
+        Merges another sketch into this one
+        :param other: QuantileSketch instance
+        :return: self
+        """
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for h, compactor in enumerate(other.compactors):
+            self.compactors[h].extend(compactor)
+        self.n += other.n
+        self._size = sum(len(c) for c in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    def quantile(self, q):
+        """
+        Estimates the value at the given quantile
+        :param q: quantile between 0 and 1
+        :return: value at quantile q
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(u"q must be between 0 and 1")
+        if self.n == 0:
+            raise ValueError(u"Sketch is empty")
+        items = sorted(
+            (value, 1 << h)
+            for h, compactor in enumerate(self.compactors)
+            for value in compactor
+        )
+        target = q * sum(weight for value, weight in items)
+        cumulative = 0
+        for value, weight in items:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return items[-1][0]
+
+
+def _uniform(rng):
+    # uniform in (0, 1), so that its logarithm is finite and negative
+    u = rng.random()
+    while u == 0.0:
+        u = rng.random()
+    return u
+
+
+def _geometric(rng, log_q):
+    """
+    :param log_q: log of the probability of skipping an element
+    :return: number of elements to skip before the next one is taken
+    """
+    if log_q == 0.0:
+        return 0
+    return int(math.log(_uniform(rng)) / log_q)
+
+
+def reservoir_sample(iterable, k, seed=None):
+    """
+    Uniform random sample of k elements in a single pass with O(k) memory.
+    Uses Algorithm L, which draws random numbers only for the elements that
+    enter the reservoir and skips the others with islice
+    :param iterable: the elements to sample
+    :param k: sample size
+    :param seed: seed for the random numbers, for reproducible samples
+    :return: list of at most k elements in the order they were read
+    """
+    rng = random.Random(seed)
+    iterator = iter(iterable)
+    reservoir = list(enumerate(itertools.islice(iterator, k)))
+    if len(reservoir) < k or k == 0:
+        return [element for index, element in reservoir]
+    index = k - 1
+    w = math.exp(math.log(_uniform(rng)) / k)
+    while True:
+        skip = _geometric(rng, math.log1p(-w)) if w < 1.0 else 0
+        element = next(itertools.islice(iterator, skip, None), _END)
+        if element is _END:
+            break
+        index += skip + 1
+        reservoir[rng.randrange(k)] = (index, element)
+        w *= math.exp(math.log(_uniform(rng)) / k)
+    reservoir.sort(key=itemgetter(0))
+    return [element for index, element in reservoir]
+
+
+def bernoulli_sample(iterable, p, seed=None):
+    """
+    Lazily takes each element independently with probability p. The gaps
+    between taken elements are drawn from a geometric distribution, so only
+    one random number is drawn per taken element
+    :param iterable: the elements to sample
+    :param p: probability of taking an element
+    :param seed: seed for the random numbers, for reproducible samples
+    :return: generator of the taken elements in order
+    """
+    if p <= 0:
+        return
+    rng = random.Random(seed)
+    iterator = iter(iterable)
+    log_q = math.log1p(-p) if p < 1 else 0.0
+    while True:
+        element = next(itertools.islice(iterator, _geometric(rng, log_q), None), _END)
+        if element is _END:
+            return
+        yield element
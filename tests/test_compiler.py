@@ -0,0 +1,90 @@
+import itertools
+from unittest import TestCase
+from py_linq import Enumerable
+from py_linq.py_linq import CompiledEnumerable
+from tests import _empty, _simple, _complex
+
+
+class TestCompiler(TestCase):
+    def setUp(self):
+        self.numbers = Enumerable(list(range(50)))
+
+    def queries(self, source):
+        return [
+            source.select(lambda x: x * 2),
+            source.where(lambda x: x % 3 == 0).select(lambda x: x + 1),
+            source.skip(3).take(10).where(lambda x: x % 2 == 0),
+            source.take(10).skip(3),
+            source.take(0),
+            source.skip(0).take(4),
+            source.skip_while(lambda x: x < 7).take_while(lambda x: x < 30),
+            source.select_many(lambda x: [x, x]).where(lambda x: x % 4 == 0).take(7),
+            source.where(lambda x: x > 5)
+            .select_many(lambda x: range(x % 4))
+            .skip(2)
+            .take(9)
+            .select(lambda x: x * 10),
+            source.take(12).select_many(lambda x: [x] * (x % 3)).take(5).skip(1),
+            source.take_while(lambda x: x < 3),
+            source.skip_while(lambda x: x < 100),
+        ]
+
+    def test_compile_matches_interpreted(self):
+        for source in [self.numbers, Enumerable(_empty), Enumerable(_simple)]:
+            for query in self.queries(source):
+                compiled = query.compile()
+                self.assertIsInstance(compiled, CompiledEnumerable)
+                self.assertListEqual(query.to_list(), compiled.to_list())
+                self.assertListEqual(query.to_list(), compiled.to_list())
+        self.assertListEqual(
+            [2],
+            Enumerable(_complex)
+            .select(lambda x: x["value"])
+            .where(lambda x: x == 2)
+            .compile()
+            .to_list(),
+        )
+
+    def test_take_before_select_many(self):
+        source = Enumerable([1, 2, 3])
+        queries = [
+            source.take(1).select_many(lambda x: [x, x, x]),
+            source.take(2).select_many(lambda x: [x, x * 10]).skip(1),
+            source.take(2).select_many(lambda x: [x, x * 10]).take(3),
+            source.select_many(lambda x: [x, x])
+            .take(3)
+            .select_many(lambda x: [x, -x])
+            .take(5),
+        ]
+        expected = [[1, 1, 1], [10, 2, 20], [1, 10, 2], [1, -1, 1, -1, 2]]
+        for query, result in zip(queries, expected):
+            self.assertListEqual(result, query.to_list())
+            self.assertListEqual(result, query.compile().to_list())
+
+    def test_compile_reads_lazily(self):
+        read = []
+
+        def source():
+            for i in itertools.count():
+                read.append(i)
+                yield i
+
+        query = Enumerable(itertools.chain.from_iterable([source()]))
+        compiled = query.where(lambda x: x % 2 == 0).take(3).compile()
+        self.assertListEqual([0, 2, 4], compiled.to_list())
+        self.assertListEqual([0, 1, 2, 3, 4], read)
+
+    def test_compile_caches_shapes(self):
+        first = self.numbers.where(lambda x: x > 1).take(3).compile()
+        second = self.numbers.where(lambda x: x < 1).take(5).compile()
+        self.assertIs(first.function, second.function)
+        self.assertListEqual([2, 3, 4], first.to_list())
+        self.assertListEqual([0], second.to_list())
+
+    def test_compile_without_streaming_stages(self):
+        self.assertIs(self.numbers, self.numbers.compile())
+        ordered = self.numbers.order_by(lambda x: -x)
+        self.assertIs(ordered, ordered.compile())
+        compiled = ordered.take(2).compile()
+        self.assertIs(ordered, compiled.data)
+        self.assertListEqual([49, 48], compiled.to_list())
@@ -0,0 +1,129 @@
+import random
+from unittest import TestCase
+from py_linq import Enumerable
+from tests import _locations
+
+
+class TestExternal(TestCase):
+    def test_order_by_external(self):
+        data = list(range(1000))
+        random.Random(7).shuffle(data)
+        test = Enumerable(data)
+        self.assertListEqual(
+            sorted(data), test.order_by(lambda x: x, max_in_memory=64).to_list()
+        )
+        self.assertListEqual(
+            sorted(data, reverse=True),
+            test.order_by_descending(lambda x: x, max_in_memory=64).to_list(),
+        )
+        self.assertListEqual(
+            [0, 1, 2], test.order_by(lambda x: x, max_in_memory=64).take(3).to_list()
+        )
+        self.assertListEqual(
+            sorted(data), test.order_by(lambda x: x, max_in_memory=5000).to_list()
+        )
+        self.assertRaises(ValueError, test.order_by, lambda x: x, max_in_memory=0)
+
+    def test_order_by_external_is_stable(self):
+        locations = Enumerable(_locations)
+        for budget in [1, 2, 3, 13]:
+            self.assertListEqual(
+                locations.order_by(lambda loc: loc[3]).to_list(),
+                locations.order_by(lambda loc: loc[3], max_in_memory=budget).to_list(),
+            )
+            self.assertListEqual(
+                locations.order_by_descending(lambda loc: loc[0])
+                .then_by(lambda loc: loc[1])
+                .then_by_descending(lambda loc: loc[3])
+                .to_list(),
+                locations.order_by_descending(lambda loc: loc[0], max_in_memory=budget)
+                .then_by(lambda loc: loc[1])
+                .then_by_descending(lambda loc: loc[3])
+                .to_list(),
+            )
+            self.assertListEqual(
+                locations.order_by(lambda loc: loc[0]).to_list(),
+                locations.order_by(lambda loc: loc[0], max_in_memory=budget).to_list(),
+            )
+
+    def test_then_by_external_keeps_parent_order(self):
+        data = [(i % 3, -i) for i in range(20)]
+        for budget in [None, 2]:
+            first = Enumerable(data).order_by(lambda x: x[0], max_in_memory=budget)
+            expected = first.to_list()
+            then = first.then_by(lambda x: x[1])
+            descending = first.then_by_descending(lambda x: x[1])
+            self.assertListEqual(expected, first.to_list())
+            self.assertListEqual(sorted(data), then.to_list())
+            self.assertListEqual(
+                sorted(data, key=lambda x: (x[0], -x[1])), descending.to_list()
+            )
+
+    def test_group_by_partitioned(self):
+        def summary(g):
+            return g.key.country, g.key.city, g.to_list()
+
+        locations = Enumerable(_locations)
+        expected = (
+            locations.group_by(["country", "city"], lambda loc: [loc[0], loc[1]])
+            .select(summary)
+            .order_by(lambda g: (g[0], g[1]))
+            .to_list()
+        )
+        for budget in [1, 2, 5, 13]:
+            grouped = locations.group_by(
+                ["country", "city"], lambda loc: [loc[0], loc[1]], max_in_memory=budget
+            )
+            self.assertEqual(7, grouped.count())
+            self.assertListEqual(
+                expected,
+                grouped.select(summary).order_by(lambda g: (g[0], g[1])).to_list(),
+            )
+        self.assertListEqual(
+            [20, 20, 20],
+            Enumerable.range(0, 60)
+            .group_by(["id"], lambda x: x % 3, lambda g: g.count(), max_in_memory=7)
+            .to_list(),
+        )
+
+    def test_join_partitioned(self):
+        outer = Enumerable([(i, i % 10) for i in range(200)])
+        inner = Enumerable([(k, "v{0}".format(k)) for k in range(10)] * 3)
+        expected = outer.join(
+            inner, lambda o: o[1], lambda i: i[0], lambda r: (r[0][0], r[1][1])
+        ).to_list()
+        for budget in [1, 4, 30, 100]:
+            joined = outer.join(
+                inner,
+                lambda o: o[1],
+                lambda i: i[0],
+                lambda r: (r[0][0], r[1][1]),
+                max_in_memory=budget,
+            ).to_list()
+            self.assertEqual(600, len(joined))
+            self.assertListEqual(sorted(expected), sorted(joined))
+        self.assertListEqual(
+            expected,
+            outer.join(
+                inner,
+                lambda o: o[1],
+                lambda i: i[0],
+                lambda r: (r[0][0], r[1][1]),
+                max_in_memory=30,
+            ).to_list(),
+        )
+
+    def test_group_join_partitioned(self):
+        def summary(r):
+            return r[0], r[1].to_list()
+
+        outer = Enumerable(list(range(20)))
+        inner = Enumerable([2, 3, 3, 5] * 2)
+        expected = outer.group_join(inner, result_func=summary).to_list()
+        for budget in [1, 3, 8]:
+            self.assertListEqual(
+                expected,
+                outer.group_join(inner, result_func=summary, max_in_memory=budget)
+                .order_by(lambda r: r[0])
+                .to_list(),
+            )
@@ -0,0 +1,146 @@
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import pathlib
+import shutil
+import tempfile
+from unittest import TestCase
+from py_linq import Enumerable
+from tests import _locations
+
+
+class TestFiles(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text, opener=io.open):
+        path = os.path.join(self.directory, name)
+        with opener(path, "wb") as f:
+            f.write(text.encode("utf-8"))
+        return path
+
+    def test_from_lines(self):
+        path = self.write("lines.txt", "first\nsecond\r\nthird")
+        lines = Enumerable.from_lines(path)
+        self.assertListEqual(["first", "second", "third"], lines.to_list())
+        self.assertListEqual(["second"], lines.skip(1).take(1).to_list())
+        self.assertEqual(3, lines.count())
+        self.assertListEqual(
+            ["first\n", "second\n", "third"],
+            Enumerable.from_lines(path, keep_newlines=True).to_list(),
+        )
+
+    def test_from_lines_rereads_file(self):
+        path = self.write("lines.txt", "first\n")
+        lines = Enumerable.from_lines(path)
+        self.assertListEqual(["first"], lines.to_list())
+        self.write("lines.txt", "first\nsecond\n")
+        self.assertListEqual(["first", "second"], lines.to_list())
+
+    def test_from_lines_compressed(self):
+        for name, opener in [
+            ("lines.gz", gzip.open),
+            ("lines.bz2", bz2.open),
+            ("lines.xz", lzma.open),
+        ]:
+            path = self.write(name, "a\nb\n", opener)
+            self.assertListEqual(["a", "b"], Enumerable.from_lines(path).to_list())
+
+    def test_from_csv(self):
+        text = "country,city,branch,sales\n" + "\n".join(
+            ",".join(str(v) for v in location) for location in _locations
+        )
+        path = self.write("locations.csv.gz", text, gzip.open)
+        rows = Enumerable.from_csv(path)
+        self.assertEqual(len(_locations), rows.count())
+        self.assertDictEqual(
+            {
+                "country": "Scotland",
+                "city": "Edinburgh",
+                "branch": "Branch1",
+                "sales": "20000",
+            },
+            rows.first(),
+        )
+        projected = Enumerable.from_csv(path, columns=["city", "sales"])
+        self.assertDictEqual({"city": "Edinburgh", "sales": "20000"}, projected.first())
+        self.assertEqual(
+            240000,
+            projected.where(lambda r: r["city"] == "London").sum(
+                lambda r: int(r["sales"])
+            ),
+        )
+        self.assertRaises(KeyError, Enumerable.from_csv(path, columns=["x"]).to_list)
+
+    def test_from_csv_without_header(self):
+        path = self.write("rows.csv", "1;a;x\n2;b;y\n")
+        self.assertListEqual(
+            [["1", "a", "x"], ["2", "b", "y"]],
+            Enumerable.from_csv(path, header=False, delimiter=";").to_list(),
+        )
+        self.assertListEqual(
+            [["1", "x"], ["2", "y"]],
+            Enumerable.from_csv(
+                path, columns=[0, 2], header=False, delimiter=";"
+            ).to_list(),
+        )
+
+    def test_from_jsonl(self):
+        documents = [{"value": 1}, {"value": 2}, {"value": 3}]
+        text = "\n".join(json.dumps(d) for d in documents) + "\n\n"
+        path = self.write("documents.jsonl", text)
+        test = Enumerable.from_jsonl(path)
+        self.assertListEqual(documents, test.to_list())
+        self.assertEqual(6, test.sum(lambda d: d["value"]))
+
+    def test_to_jsonl(self):
+        documents = [{"value": i} for i in range(2500)]
+        for name in ["out.jsonl", "out.jsonl.gz", "out.jsonl.bz2", "out.jsonl.xz"]:
+            path = os.path.join(self.directory, name)
+            result = Enumerable(documents).to_jsonl(path)
+            self.assertEqual(2500, result.count)
+            self.assertEqual(
+                sum(len(json.dumps(d)) + 1 for d in documents), result.bytes
+            )
+            self.assertListEqual(documents, Enumerable.from_jsonl(path).to_list())
+        path = pathlib.Path(self.directory, "path.jsonl.gz")
+        Enumerable(documents).to_jsonl(path)
+        with gzip.open(str(path), "rt") as f:
+            self.assertListEqual(documents, [json.loads(line) for line in f])
+        self.assertListEqual(documents, Enumerable.from_jsonl(path).to_list())
+
+    def test_to_csv(self):
+        path = os.path.join(self.directory, "out.csv")
+        rows = Enumerable(_locations).select(
+            lambda loc: {"city": loc[1], "sales": loc[3], "branch": loc[2]}
+        )
+        result = rows.to_csv(path, columns=["city", "sales"], batch_size=5)
+        self.assertEqual(len(_locations), result.count)
+        self.assertEqual(os.path.getsize(path), result.bytes)
+        self.assertDictEqual(
+            {"city": "Edinburgh", "sales": "20000"}, Enumerable.from_csv(path).first()
+        )
+        result = Enumerable(_locations).to_csv(path, header=False)
+        self.assertListEqual(
+            [list(str(v) for v in loc) for loc in _locations],
+            Enumerable.from_csv(path, header=False).to_list(),
+        )
+        result = Enumerable([]).to_csv(path)
+        self.assertEqual(0, result.count)
+
+    def test_write_to(self):
+        text = io.StringIO()
+        result = Enumerable.range(1, 3).write_to(text, batch_size=2)
+        self.assertEqual("1\n2\n3\n", text.getvalue())
+        self.assertEqual((3, 6), result)
+        binary = io.BytesIO()
+        result = Enumerable([u"\u00e9"]).write_to(binary, lambda s: s)
+        self.assertEqual(u"\u00e9".encode("utf-8"), binary.getvalue())
+        self.assertEqual((1, 2), result)
+        self.assertRaises(ValueError, Enumerable([]).write_to, text, batch_size=0)
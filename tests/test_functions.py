@@ -1,7 +1,13 @@
-from unittest import TestCase
+import itertools
+import pickle
+from operator import itemgetter
+from unittest import TestCase, mock
 from py_linq import Enumerable
+from py_linq.aggregates import Avg, Count, Max, Min, Sum
+from py_linq.core import Key, KeyPath, resolve, resolve_first
 from tests import _empty, _simple, _complex, _locations
 from py_linq.exceptions import (
+    KeyLimitExceeded,
     NoElementsError,
     NullArgumentError,
     NoMatchingElement,
@@ -319,6 +325,111 @@ class TestFunctions(TestCase):
         )
         self.assertEqual(240000, london.sum(lambda c: c[3]))
 
+    def test_aggregate_by(self):
+        locations = Enumerable(_locations)
+        expected = (
+            locations.group_by(["country"], lambda loc: loc[0])
+            .select(
+                lambda g: (
+                    g.key.country,
+                    g.count(),
+                    g.sum(lambda loc: loc[3]),
+                    g.max(lambda loc: loc[3]),
+                    g.min(lambda loc: loc[3]),
+                    g.avg(lambda loc: loc[3]),
+                )
+            )
+            .to_list()
+        )
+        aggregated = locations.aggregate_by(
+            ["country"],
+            lambda loc: loc[0],
+            lambda g: (g.key.country, g.count, g.total, g.hi, g.lo, g.mean),
+            count=Count(),
+            total=Sum(lambda loc: loc[3]),
+            hi=Max(lambda loc: loc[3]),
+            lo=Min(lambda loc: loc[3]),
+            mean=Avg(lambda loc: loc[3]),
+        )
+        self.assertListEqual(expected, aggregated.to_list())
+        self.assertEqual(3, aggregated.count())
+
+        cities = locations.aggregate_by(
+            ["country", "city"],
+            lambda loc: [loc[0], loc[1]],
+            big=Count(lambda loc: loc[3] > 40000),
+        )
+        self.assertEqual(7, cities.count())
+        london = cities.single(lambda c: c.key.city == "London")
+        self.assertEqual("England", london.key.country)
+        self.assertEqual(3, london.big)
+
+        self.assertListEqual(
+            [], self.empty.aggregate_by(["id"], count=Count()).to_list()
+        )
+        self.assertRaises(TypeError, self.simple.aggregate_by, ["id"], count=len)
+
+    def test_aggregate_merge(self):
+        values = [4, 9, 1, 7, 3, 8]
+        for aggregate in [Count(lambda x: x > 3), Sum(), Max(), Min(), Avg()]:
+            states = [aggregate.initial(), aggregate.initial()]
+            for i, value in enumerate(values):
+                states[i % 2] = aggregate.step(states[i % 2], value)
+            whole = aggregate.initial()
+            for value in values:
+                whole = aggregate.step(whole, value)
+            merged = aggregate.merge(states[0], states[1])
+            self.assertEqual(aggregate.result(whole), aggregate.result(merged))
+            empty = aggregate.initial()
+            self.assertEqual(
+                aggregate.result(whole),
+                aggregate.result(aggregate.merge(empty, merged)),
+            )
+            self.assertEqual(
+                aggregate.result(whole),
+                aggregate.result(aggregate.merge(merged, empty)),
+            )
+        for aggregate in [Max(), Min(), Avg()]:
+            empty = aggregate.merge(aggregate.initial(), aggregate.initial())
+            self.assertRaises(NoElementsError, aggregate.result, empty)
+
+    def test_group_by_compact_objects(self):
+        grouped = Enumerable(_locations).group_by(
+            key_names=["country", "city"], key=lambda x: [x[0], x[1]]
+        )
+        first, second = grouped.take(2).to_list()
+        self.assertFalse(hasattr(first, "__dict__"))
+        self.assertFalse(hasattr(first.key, "__dict__"))
+        self.assertIs(type(first.key), type(second.key))
+        self.assertEqual("Edinburgh", first.key.city)
+        self.assertEqual(Key(country="Scotland", city="Edinburgh"), first.key)
+        self.assertNotEqual(first.key, second.key)
+        self.assertEqual(
+            1, len({first.key, Key({"country": "Scotland", "city": "Edinburgh"})})
+        )
+        self.assertEqual(
+            "{'country': 'Scotland', 'city': 'Edinburgh'}", repr(first.key)
+        )
+        self.assertEqual(1, len(first))
+        self.assertEqual(first.first(), first.next())
+
+    def test_key_names_of_key_members(self):
+        names = ["_fields", "_make", "_values", "_asdict"]
+        grouped = self.simple.group_by(names, lambda x: [x] * 4).to_list()
+        self.assertEqual(3, len(grouped))
+        key = grouped[0].key
+        self.assertEqual([1, 1, 1, 1], [getattr(key, name) for name in names])
+        self.assertEqual(Key(dict((name, 1) for name in names)), key)
+        self.assertEqual(
+            "{'_fields': 1, '_make': 1, '_values': 1, '_asdict': 1}", repr(key)
+        )
+        self.assertEqual(key, pickle.loads(pickle.dumps(key)))
+        self.assertEqual(1, len({key, Key(dict((name, 1) for name in names))}))
+        self.assertNotEqual(grouped[1].key, key)
+        counted = self.simple.aggregate_by(["_fields"], count=Count()).to_list()
+        self.assertEqual([1, 2, 3], [g.key._fields for g in counted])
+        self.assertEqual(4, Key({"__class__": 3, "b": 4}).b)
+
     def test_distinct(self):
         self.assertListEqual([], self.empty.distinct().to_list())
         self.assertListEqual(
@@ -336,6 +447,30 @@ class TestFunctions(TestCase):
             locations.order_by(lambda l: l[0]).to_list(),
         )
 
+    def test_distinct_streaming(self):
+        calls = []
+
+        def key(x):
+            calls.append(x)
+            return x % 5
+
+        self.assertListEqual(
+            [0, 1, 2, 3, 4], Enumerable(itertools.count()).distinct().take(5).to_list()
+        )
+        distinct = Enumerable([5, 1, 6, 2, 5]).distinct(key)
+        self.assertListEqual([5, 1, 2], distinct.to_list())
+        self.assertEqual(5, len(calls))
+        self.assertListEqual([5, 1, 2], distinct.to_list())
+
+    def test_distinct_max_keys(self):
+        test = Enumerable([1, 2, 1, 3, 1, 2])
+        self.assertRaises(KeyLimitExceeded, test.distinct(max_keys=2).to_list)
+        self.assertListEqual(
+            [1, 2, 3, 2], test.distinct(max_keys=2, evict=True).to_list()
+        )
+        self.assertListEqual([1, 2, 3], test.distinct(max_keys=3).to_list())
+        self.assertRaises(ValueError, test.distinct, max_keys=0)
+
     def test_default_if_empty(self):
         self.assertListEqual([None], self.empty.default_if_empty().to_list())
         self.assertListEqual(_simple, self.simple.default_if_empty().to_list())
@@ -521,6 +656,87 @@ class TestFunctions(TestCase):
             simple_gj.to_list(),
         )
 
+    def test_outer_joins(self):
+        numbers = Enumerable([1, 2, 2, 3])
+        others = Enumerable([2, 3, 3, 4])
+        self.assertRaises(TypeError, numbers.left_join, [])
+        self.assertListEqual(
+            [(1, None), (2, 2), (2, 2), (3, 3), (3, 3)],
+            numbers.left_join(others).to_list(),
+        )
+        self.assertListEqual(
+            [(2, 2), (2, 2), (3, 3), (3, 3), (None, 4)],
+            numbers.right_join(others).to_list(),
+        )
+        self.assertListEqual(
+            [(1, None), (2, 2), (2, 2), (3, 3), (3, 3), (None, 4)],
+            numbers.full_join(others).to_list(),
+        )
+        self.assertListEqual(
+            [(1, None), (2, None), (3, None)],
+            self.simple.left_join(self.empty).to_list(),
+        )
+        self.assertListEqual([], self.empty.left_join(self.simple).to_list())
+        self.assertListEqual(
+            [(None, 1), (None, 2), (None, 3)],
+            self.empty.full_join(self.simple).to_list(),
+        )
+        self.assertListEqual(
+            [(1, 1), (2, 2), (3, 3)],
+            self.complex.right_join(
+                self.simple,
+                outer_key="value",
+                result_func=lambda r: (r[0]["value"], r[1]),
+            ).to_list(),
+        )
+
+    def test_outer_joins_partitioned(self):
+        numbers = Enumerable(list(range(50)))
+        evens = Enumerable(list(range(0, 100, 2)))
+        for name in ["left_join", "right_join", "full_join"]:
+            expected = sorted(
+                getattr(numbers, name)(evens).to_list(), key=lambda r: str(r)
+            )
+            result = getattr(numbers, name)(evens, max_in_memory=4).to_list()
+            self.assertListEqual(expected, sorted(result, key=lambda r: str(r)))
+
+    def test_semi_and_anti_join(self):
+        people = Enumerable([{"id": 1}, {"id": 2}, {"id": 2}, {"id": 3}])
+        orders = Enumerable([{"person": 2}, {"person": 2}, {"person": 5}])
+        self.assertRaises(TypeError, people.semi_join, [])
+        self.assertListEqual(
+            [{"id": 2}, {"id": 2}], people.semi_join(orders, "id", "person").to_list()
+        )
+        self.assertListEqual(
+            [{"id": 1}, {"id": 3}], people.anti_join(orders, "id", "person").to_list()
+        )
+        self.assertListEqual(
+            [2, 3], self.simple.semi_join(Enumerable([3, 2, 2])).to_list()
+        )
+        self.assertListEqual(
+            self.simple.to_list(), self.simple.anti_join(self.empty).to_list()
+        )
+        self.assertListEqual([], self.empty.semi_join(self.simple).to_list())
+
+    def test_where_in(self):
+        values = (v for v in [1, 3])
+        test = self.complex.where_in("value", values)
+        self.assertListEqual([{"value": 1}, {"value": 3}], test.to_list())
+        self.assertListEqual([{"value": 1}, {"value": 3}], test.to_list())
+        self.assertListEqual(
+            [{"value": 2}], self.complex.where_not_in("value", [1, 3]).to_list()
+        )
+        self.assertListEqual(
+            [[2]], Enumerable([[1], [2]]).where_in(lambda x: x, [[2], [4]]).to_list()
+        )
+        self.assertListEqual(
+            [0, 2],
+            Enumerable(itertools.count())
+            .where_not_in(lambda x: x % 2, [1])
+            .take(2)
+            .to_list(),
+        )
+
     def test_then_by(self):
         locations = Enumerable(_locations)
         self.assertRaises(
@@ -675,8 +891,296 @@ class TestFunctions(TestCase):
         test = Enumerable([]).skip_while(lambda x: x < 5)
         self.assertListEqual(test.to_list(), [])
 
+    def test_chunk(self):
+        self.assertListEqual([], self.empty.chunk(2).to_list())
+        self.assertListEqual([[1, 2], [3]], self.simple.chunk(2).to_list())
+        self.assertListEqual([[1, 2, 3]], self.simple.chunk(3).to_list())
+        self.assertListEqual(
+            [[0, 1], [2, 3]], Enumerable(itertools.count()).chunk(2).take(2).to_list()
+        )
+        self.assertRaises(ValueError, self.simple.chunk, 0)
+
+    def test_window(self):
+        test = Enumerable([1, 2, 3, 4, 5])
+        self.assertListEqual([], self.empty.window(2).to_list())
+        self.assertListEqual([], self.simple.window(4).to_list())
+        self.assertListEqual(
+            [(1, 2, 3), (2, 3, 4), (3, 4, 5)], test.window(3).to_list()
+        )
+        self.assertListEqual([(1, 2), (3, 4)], test.window(2, 2).to_list())
+        self.assertListEqual([(1, 2), (4, 5)], test.window(2, 3).to_list())
+        self.assertListEqual(
+            [(0, 1, 2), (2, 3, 4)],
+            Enumerable(itertools.count()).window(3, 2).take(2).to_list(),
+        )
+        self.assertRaises(ValueError, self.simple.window, 2, 0)
+
+    def test_event_time_windows(self):
+        events = [(1, "a"), (3, "b"), (11, "c"), (9, "d"), (25, "e"), (5, "f")]
+
+        def windows(enumerable):
+            return enumerable.select(
+                lambda g: (g.key.start, g.key.end, [e[1] for e in g])
+            ).to_list()
+
+        self.assertListEqual([], self.empty.tumbling_window(lambda e: e, 10).to_list())
+        self.assertListEqual(
+            [(0, 10, ["a", "b"]), (10, 20, ["c"]), (20, 30, ["e"])],
+            windows(Enumerable(events).tumbling_window(lambda e: e[0], 10)),
+        )
+        self.assertListEqual(
+            [(0, 10, ["a", "b", "d"]), (10, 20, ["c"]), (20, 30, ["e"])],
+            windows(Enumerable(events).tumbling_window(lambda e: e[0], 10, 5)),
+        )
+        self.assertListEqual(
+            [
+                (-5, 5, ["a", "b"]),
+                (0, 10, ["a", "b"]),
+                (5, 15, ["c", "d"]),
+                (10, 20, ["c"]),
+                (20, 30, ["e"]),
+                (25, 35, ["e"]),
+            ],
+            windows(Enumerable(events).sliding_window(lambda e: e[0], 10, 5)),
+        )
+        totals = (
+            Enumerable.range(0, 100)
+            .tumbling_window(lambda x: x, 25, count=Count(), total=Sum())
+            .select(lambda w: (w.key.start, w.count, w.total))
+            .to_list()
+        )
+        self.assertListEqual(
+            [(s, 25, sum(range(s, s + 25))) for s in range(0, 100, 25)], totals
+        )
+        # windows close as the stream advances, so infinite streams work
+        first = (
+            Enumerable(itertools.count())
+            .sliding_window(lambda x: x, 4, 2)
+            .select(lambda g: g.to_list())
+            .take(3)
+            .to_list()
+        )
+        self.assertListEqual([[0, 1], [0, 1, 2, 3], [2, 3, 4, 5]], first)
+        self.assertRaises(ValueError, self.simple.sliding_window, lambda x: x, 4, 0)
+        self.assertRaises(ValueError, self.simple.tumbling_window, lambda x: x, 4, -1)
+        self.assertRaises(
+            TypeError, self.simple.tumbling_window, lambda x: x, 4, count=len
+        )
+
+    def test_select_batch(self):
+        batches = []
+
+        def double(batch):
+            batches.append(len(batch))
+            return [x * 2 for x in batch]
+
+        self.assertListEqual([], self.empty.select_batch(double, 2).to_list())
+        self.assertListEqual(
+            [0, 2, 4, 6, 8], Enumerable(range(5)).select_batch(double, 2).to_list()
+        )
+        self.assertListEqual([2, 2, 1], batches)
+        self.assertEqual(5, len(Enumerable(range(5)).select_batch(double, 2)))
+        self.assertListEqual(
+            [0, 2, 4],
+            Enumerable(itertools.count()).select_batch(double, 2).take(3).to_list(),
+        )
+        self.assertRaises(
+            ValueError, self.simple.select_batch(lambda b: b[1:], 2).to_list
+        )
+        self.assertRaises(ValueError, self.simple.select_batch, double, 0)
+        self.assertRaises(
+            ValueError, self.simple.select_batch, double, 1, target_latency=0
+        )
+
+    def test_select_batch_adaptive(self):
+        batches = []
+
+        def identity(batch):
+            batches.append(len(batch))
+            return batch
+
+        result = (
+            Enumerable(range(1000))
+            .select_batch(identity, 1, target_latency=10)
+            .to_list()
+        )
+        self.assertListEqual(list(range(1000)), result)
+        self.assertListEqual([1, 2, 4, 8, 16, 32], batches[:6])
+
     def test_zip(self):
         test = Enumerable(["A", "B", "C", "D"]).zip(
             Enumerable(["x", "y"]), lambda t: "{0}{1}".format(t[0], t[1])
         )
         self.assertListEqual(test.to_list(), ["Ax", "By"])
+
+    def test_key_paths(self):
+        people = Enumerable(
+            [
+                {"id": 3, "name": {"first": "Ann"}, "tags": ["b", "x"]},
+                {"id": 1, "name": {"first": "Bob"}, "tags": ["a", "y"]},
+                {"id": 2, "name": {"first": "Ann"}, "tags": ["c", "z"]},
+            ]
+        )
+        self.assertListEqual([3, 1, 2], people.select("id").to_list())
+        self.assertListEqual([1, 2, 3], people.order_by("id").select("id").to_list())
+        self.assertListEqual(
+            ["y", "x", "z"],
+            people.order_by("tags.0").select("tags.1").to_list(),
+        )
+        self.assertListEqual(
+            [2, 3, 1],
+            people.order_by("name.first")
+            .then_by("id")
+            .select(("id", "name.first"))
+            .select("0")
+            .to_list(),
+        )
+        self.assertListEqual(
+            [("Ann", 2), ("Bob", 1)],
+            people.group_by(["first"], ("name.first",))
+            .select(lambda g: (g.key.first, g.count()))
+            .to_list(),
+        )
+        self.assertEqual(2, people.distinct("name.first").count())
+        self.assertEqual(6, people.sum("id"))
+        self.assertEqual(3, people.max("id"))
+        self.assertEqual(1, people.min("id"))
+        self.assertListEqual(
+            ["b", "x", "a", "y", "c", "z"], people.select_many("tags").to_list()
+        )
+        self.assertListEqual(
+            [(1, "Bob")],
+            people.join(
+                Enumerable([{"person": 1}]),
+                "id",
+                "person",
+                lambda r: (r[0]["id"], r[0]["name"]["first"]),
+            ).to_list(),
+        )
+        self.assertListEqual(
+            [(3, 72500)],
+            Enumerable(_locations)
+            .aggregate_by(["country"], ("0",), total=Sum("3"), count=Count())
+            .where(lambda g: g.key.country == "Wales")
+            .select(lambda g: (g.count, g.total))
+            .to_list(),
+        )
+        self.assertListEqual(
+            [("London", "Branch1")],
+            Enumerable(_locations).take(7).skip(6).select(("1", "2")).to_list(),
+        )
+
+    def test_key_paths_use_compiled_getters(self):
+        self.assertIs(itemgetter, type(resolve(KeyPath("value"), _complex[0])))
+        key, elements = resolve_first(KeyPath("value"), _complex)
+        self.assertIs(itemgetter, type(key))
+        self.assertListEqual(_complex, list(elements))
+        rows = Enumerable([{"id": i % 3, "v": i} for i in range(10)])
+        # the loops of key based operators must not go through KeyPath.__call__
+        with mock.patch.object(KeyPath, "__call__", side_effect=AssertionError):
+            self.assertEqual(3, rows.distinct("id").count())
+            self.assertEqual(3, rows.distinct("id", max_keys=5).count())
+            self.assertEqual(3, rows.group_by(["id"], "id").count())
+            self.assertEqual(3, rows.aggregate_by(["id"], "id", n=Count()).count())
+            self.assertEqual(34, rows.join(rows, "id", "id").count())
+            self.assertEqual(34, rows.join(rows, "id", "id", max_in_memory=100).count())
+            self.assertEqual(10, rows.left_join(rows.take(2), "id", "id").count())
+            self.assertEqual(4, rows.where_in("id", [0]).count())
+            self.assertEqual(3, rows.union(rows, "id").count())
+
+    def test_key_paths_on_objects(self):
+        groups = Enumerable(_locations).group_by(["country", "city"], lambda x: x[:2])
+        self.assertListEqual(
+            ["Bangor", "Cardiff"],
+            groups.where(lambda g: g.key.country == "Wales")
+            .order_by("key.city")
+            .select("key.city")
+            .to_list(),
+        )
+        self.assertListEqual(
+            [("Scotland", "Edinburgh")],
+            groups.take(1).select(("key.country", "key.city")).to_list(),
+        )
+        self.assertRaises(TypeError, self.simple.select, 1)
+        self.assertRaises(TypeError, self.simple.order_by, ["a"])
+
+    def test_zip_many(self):
+        letters = Enumerable(["A", "B", "C"])
+        self.assertListEqual(
+            [(1, "A", 1), (2, "B", 2)],
+            self.simple.zip(letters, Enumerable([1, 2])).to_list(),
+        )
+        self.assertListEqual(
+            ["1A", "2B", "3C"],
+            self.simple.zip(letters, func=lambda t: "{0}{1}".format(*t)).to_list(),
+        )
+        self.assertEqual(
+            2, len(self.simple.zip(Enumerable(itertools.count(5)).take(2)))
+        )
+        self.assertListEqual(
+            [(1, 0), (2, 1), (3, 2)],
+            self.simple.zip(Enumerable(itertools.count())).to_list(),
+        )
+        self.assertRaises(TypeError, self.simple.zip)
+        self.assertRaises(TypeError, self.simple.zip, [1, 2])
+        self.assertRaises(TypeError, self.simple.zip, letters, fun=len)
+
+    def test_zip_iterates_once(self):
+        reads = []
+
+        def source():
+            for i in range(3):
+                reads.append(i)
+                yield i
+
+        class Once(object):
+            def __iter__(self):
+                return source()
+
+        test = self.simple.zip(Enumerable(Once()))
+        self.assertListEqual([(1, 0), (2, 1), (3, 2)], test.to_list())
+        self.assertListEqual([0, 1, 2], reads)
+
+    def test_zip_longest(self):
+        letters = Enumerable(["A", "B", "C", "D"])
+        self.assertListEqual(
+            [(1, "A"), (2, "B"), (3, "C"), (None, "D")],
+            self.simple.zip_longest(letters).to_list(),
+        )
+        self.assertListEqual(
+            ["1A", "2B", "3C", "0D"],
+            self.simple.zip_longest(
+                letters, fill=0, func=lambda t: "{0}{1}".format(*t)
+            ).to_list(),
+        )
+        self.assertEqual(4, len(letters.zip_longest(self.simple, self.empty)))
+
+    def test_concat_is_flat(self):
+        test = self.empty
+        for i in range(5000):
+            test = test.append(i)
+        self.assertEqual(5000, len(test))
+        self.assertEqual(sum(range(5000)), test.sum())
+
+        base = self.simple.append(4)
+        first = base.append(5)
+        second = base.append(6).concat(first)
+        self.assertListEqual([1, 2, 3, 4], base.to_list())
+        self.assertListEqual([1, 2, 3, 4, 5], first.to_list())
+        self.assertListEqual([1, 2, 3, 4, 6, 1, 2, 3, 4, 5], second.to_list())
+        self.assertListEqual([1, 2, 3, 4, 1, 2, 3, 4], base.concat(base).to_list())
+        self.assertListEqual([0, 1, 2, 3, 4, 5], first.prepend(0).to_list())
+        self.assertEqual(1, first.next())
+        self.assertEqual(2, first.next())
+
+    def test_builder(self):
+        builder = Enumerable.builder()
+        self.assertListEqual([], builder.to_enumerable().to_list())
+        builder.append(1).append(2).extend(itertools.islice(itertools.count(3), 2))
+        self.assertEqual(4, len(builder))
+        built = builder.to_enumerable()
+        self.assertIsInstance(built, Enumerable)
+        self.assertListEqual([1, 2, 3, 4], built.to_list())
+        builder.append(5)
+        self.assertListEqual([1, 2, 3, 4], built.to_list())
+        self.assertListEqual([1, 2, 3, 4, 5], builder.to_enumerable().to_list())
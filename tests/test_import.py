@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+# seconds allowed for "import py_linq" in a fresh interpreter, including
+# compiling the modules when no bytecode cache is available
+IMPORT_BUDGET = 0.1
+
+# optional subsystems that must not be imported until they are used
+LAZY_MODULES = [
+    "json",
+    "hashlib",
+    "random",
+    "pickle",
+    "tempfile",
+    "csv",
+    "gzip",
+    "bz2",
+    "lzma",
+    "py_linq.external",
+    "py_linq.files",
+    "py_linq.sketches",
+    "py_linq.parallel",
+    "multiprocessing",
+    "py_linq.records",
+    "mmap",
+    "py_linq.readahead",
+    "queue",
+    "threading",
+]
+
+_SCRIPT = """
+import sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+import py_linq
+elapsed = time.perf_counter() - start
+imported = sorted(set(sys.modules) - before)
+import json
+print(json.dumps([elapsed, imported]))
+"""
+
+
+class TestImport(TestCase):
+    def import_py_linq(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, "-c", _SCRIPT], cwd=root)
+        return json.loads(output.decode("utf-8"))
+
+    def test_import_time(self):
+        elapsed = min(self.import_py_linq()[0] for i in range(3))
+        self.assertLess(elapsed, IMPORT_BUDGET)
+
+    def test_lazy_subsystems(self):
+        imported = self.import_py_linq()[1]
+        self.assertIn("py_linq", imported)
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, imported)
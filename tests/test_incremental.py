@@ -0,0 +1,96 @@
+from unittest import TestCase
+from py_linq import Enumerable
+from py_linq.aggregates import Count, Max, Min, Sum
+from py_linq.exceptions import NoElementsError
+from tests import _locations
+
+
+class TestIncremental(TestCase):
+    def setUp(self):
+        self.source = Enumerable.appendable(_locations[:5])
+        self.calls = 0
+
+    def _filter(self, location):
+        self.calls += 1
+        return location[3] > 12000
+
+    def test_appendable(self):
+        source = Enumerable.appendable()
+        query = source.select(lambda x: x * 2)
+        self.assertEqual([], query.to_list())
+        self.assertIs(source, source.push(1).extend([2, 3]))
+        self.assertEqual([2, 4, 6], query.to_list())
+        self.assertEqual(3, len(source))
+
+    def test_elements(self):
+        view = (
+            self.source.where(self._filter)
+            .select(lambda x: x[1])
+            .materialize_incremental()
+        )
+        self.assertEqual(["Edinburgh", "Glasgow", "Cardiff", "Cardiff"], view.to_list())
+        self.source.extend(_locations[5:])
+        expected = [loc[1] for loc in _locations if loc[3] > 12000]
+        self.assertEqual(expected, view.to_list())
+        self.assertEqual(len(_locations), self.calls)
+
+    def test_aggregates(self):
+        view = self.source.where(self._filter).materialize_incremental(
+            count=Count(), total=Sum(lambda x: x[3]), low=Min(lambda x: x[3])
+        )
+        self.assertEqual(
+            (4, 92200, 12500),
+            (view.first().count, view.first().total, view.first().low),
+        )
+        self.source.extend(_locations[5:])
+        result = view.first()
+        filtered = [loc[3] for loc in _locations if loc[3] > 12000]
+        self.assertEqual(
+            (len(filtered), sum(filtered), 12500),
+            (result.count, result.total, result.low),
+        )
+        self.assertEqual(len(_locations), self.calls)
+        empty = Enumerable.appendable().materialize_incremental(high=Max())
+        self.assertRaises(NoElementsError, empty.first)
+
+    def test_distinct(self):
+        view = self.source.select(lambda x: x[0]).distinct().materialize_incremental()
+        self.assertEqual(["Scotland", "Wales"], view.to_list())
+        self.source.extend(_locations[5:])
+        self.assertEqual(["Scotland", "Wales", "England"], view.to_list())
+
+    def test_grouping(self):
+        view = self.source.aggregate_by(
+            ["country"], lambda x: x[0], count=Count(), total=Sum(lambda x: x[3])
+        ).materialize_incremental()
+        groups = self.source.group_by(
+            ["country"], lambda x: x[0]
+        ).materialize_incremental()
+        self.source.extend(_locations[5:])
+        self.source.push(("Wales", "Swansea", "Branch1", 10000))
+        expected = (
+            Enumerable(self.source.to_list())
+            .aggregate_by(
+                ["country"], lambda x: x[0], count=Count(), total=Sum(lambda x: x[3])
+            )
+            .select(lambda g: (g.key.country, g.count, g.total))
+            .to_list()
+        )
+        self.assertEqual(
+            expected, view.select(lambda g: (g.key.country, g.count, g.total)).to_list()
+        )
+        self.assertEqual(
+            [(country, count) for country, count, total in expected],
+            groups.select(lambda g: (g.key.country, g.count())).to_list(),
+        )
+
+    def test_unsupported(self):
+        self.assertRaises(TypeError, self.source.take(2).materialize_incremental)
+        self.assertRaises(
+            TypeError, self.source.order_by(lambda x: x[3]).materialize_incremental
+        )
+        self.assertRaises(TypeError, Enumerable(_locations).materialize_incremental)
+        self.assertRaises(
+            TypeError, self.source.distinct(max_keys=2).materialize_incremental
+        )
+        self.assertRaises(TypeError, self.source.materialize_incremental, total=len)
@@ -0,0 +1,120 @@
+import threading
+from unittest import TestCase
+from py_linq import Enumerable
+from py_linq.aggregates import Sum
+from py_linq.exceptions import MemoryLimitExceeded
+from py_linq.memory import active_profile
+from tests import _locations
+
+
+class TestMemory(TestCase):
+    def setUp(self):
+        self.data = [{"key": i % 10, "value": i} for i in range(1000)]
+
+    def test_operators(self):
+        with Enumerable.memory_profile() as profile:
+            Enumerable(self.data).group_by(["key"], lambda x: x["key"]).to_list()
+            Enumerable(self.data).order_by("value").distinct("key").to_list()
+            Enumerable(self.data).reverse().to_list()
+        self.assertIsNone(active_profile())
+        self.assertEqual(
+            [
+                ("GroupedEnumerable", 1000),
+                ("SortedEnumerable", 1000),
+                ("DistinctEnumerable", 10),
+                ("ReversedEnumerable", 1000),
+            ],
+            [(o.operator, o.peak_elements) for o in profile.operators],
+        )
+        for o in profile.operators:
+            self.assertGreater(o.peak_bytes, o.peak_elements * 32)
+        self.assertGreaterEqual(
+            profile.peak_bytes, sum(o.peak_bytes for o in profile.operators[:2])
+        )
+        self.assertIn("SortedEnumerable", str(profile))
+
+    def test_released_buffers(self):
+        with Enumerable.memory_profile() as profile:
+            Enumerable(self.data).distinct("value").to_list()
+            Enumerable(self.data).aggregate_by(
+                ["key"], "key", total=Sum("value")
+            ).to_list()
+            Enumerable(self.data).left_join(
+                Enumerable(_locations), lambda x: x["key"], lambda loc: loc[1]
+            ).to_list()
+        self.assertEqual(0, profile.bytes)
+        self.assertEqual(
+            [
+                ("DistinctEnumerable", 1000),
+                ("AggregateEnumerable", 10),
+                ("OuterJoinEnumerable", len(_locations)),
+            ],
+            [(o.operator, o.peak_elements) for o in profile.operators],
+        )
+
+    def test_not_profiled(self):
+        with Enumerable.memory_profile() as profile:
+            query = Enumerable(self.data).distinct("value")
+            # sorts buffer when they are created
+            sorted_query = Enumerable(self.data).order_by("value")
+        query.to_list()
+        sorted_query.to_list()
+        self.assertEqual(
+            [("SortedEnumerable", 1000)],
+            [(o.operator, o.peak_elements) for o in profile.operators],
+        )
+
+    def test_early_termination(self):
+        other = Enumerable([{"key": i} for i in range(1000)])
+        with Enumerable.memory_profile(400000) as profile:
+            for i in range(20):
+                Enumerable(self.data).reverse().take(1).to_list()
+                Enumerable(self.data).distinct("value").first()
+                Enumerable(self.data).semi_join(other, "key", "key").take(1).to_list()
+                Enumerable(self.data).left_join(
+                    other, lambda x: x["key"], lambda x: x["key"]
+                ).take(1).to_list()
+                for group in Enumerable(self.data).aggregate_by(
+                    ["key"], "key", total=Sum("value")
+                ):
+                    break
+                self.assertRaises(
+                    ZeroDivisionError,
+                    Enumerable(self.data)
+                    .reverse()
+                    .select(lambda x: 1 / (x["value"] - 500))
+                    .to_list,
+                )
+        self.assertEqual(0, profile.bytes)
+
+    def test_threads(self):
+        profiles = []
+
+        def run():
+            profiles.append(active_profile())
+            Enumerable(self.data).reverse().to_list()
+
+        with Enumerable.memory_profile() as profile:
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join()
+            Enumerable(self.data).reverse().prefetch(10).take(5).to_list()
+        self.assertEqual([None], profiles)
+        self.assertEqual(
+            [("ReversedEnumerable", 1000)],
+            [(o.operator, o.peak_elements) for o in profile.operators],
+        )
+        self.assertEqual(0, profile.bytes)
+
+    def test_memory_limit(self):
+        self.assertRaises(ValueError, Enumerable.memory_profile, 0)
+        with Enumerable.memory_profile(10 ** 6):
+            Enumerable(self.data).order_by("value").to_list()
+        with Enumerable.memory_profile(10000) as profile:
+            with self.assertRaises(MemoryLimitExceeded):
+                Enumerable(self.data).order_by("value").to_list()
+        self.assertLess(profile.operators[0].peak_elements, 1000)
+        with Enumerable.memory_profile(10000):
+            query = Enumerable.range(0, 10 ** 9).distinct()
+            with self.assertRaises(MemoryLimitExceeded):
+                query.to_list()
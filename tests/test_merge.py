@@ -0,0 +1,155 @@
+import itertools
+import random
+from unittest import TestCase
+from py_linq import Enumerable
+from py_linq.exceptions import NoElementsError
+from py_linq.py_linq import (
+    JoinEnumerable,
+    MergeExceptEnumerable,
+    MergeIntersectEnumerable,
+    MergeJoinEnumerable,
+    MergeUnionEnumerable,
+)
+
+
+class TestMerge(TestCase):
+    def setUp(self):
+        self.random = random.Random(11)
+
+    def numbers(self, descending):
+        data = [self.random.randint(0, 9) for i in range(self.random.randint(0, 12))]
+        return sorted(data, reverse=descending)
+
+    def test_merge_operators_match_unsorted(self):
+        for i, descending in itertools.product(range(50), [False, True]):
+            a = self.numbers(descending)
+            b = self.numbers(descending)
+            sorted_a = Enumerable(a).assume_sorted(descending=descending)
+            sorted_b = Enumerable(b).assume_sorted(descending=descending)
+            self.assertListEqual(
+                Enumerable(a).join(Enumerable(b)).to_list(),
+                sorted_a.join(sorted_b).to_list(),
+            )
+            self.assertListEqual(
+                Enumerable(a).intersect(Enumerable(b)).to_list(),
+                sorted_a.intersect(sorted_b).to_list(),
+            )
+            self.assertListEqual(
+                Enumerable(a).except_(Enumerable(b)).to_list(),
+                sorted_a.except_(sorted_b).to_list(),
+            )
+            self.assertListEqual(
+                Enumerable(a).union(Enumerable(b)).to_list(),
+                sorted_a.union(sorted_b).to_list(),
+            )
+
+    def test_merge_operators_are_chosen(self):
+        people = Enumerable([{"id": 2}, {"id": 1}]).order_by("id")
+        ids = Enumerable([{"id": 1}, {"id": 3}]).assume_sorted("id")
+        self.assertIsInstance(people.join(ids, "id", "id"), MergeJoinEnumerable)
+        self.assertIsInstance(people.intersect(ids, "id"), MergeIntersectEnumerable)
+        self.assertIsInstance(people.except_(ids, "id"), MergeExceptEnumerable)
+        self.assertIsInstance(people.union(ids, "id"), MergeUnionEnumerable)
+        self.assertListEqual(
+            [({"id": 1}, {"id": 1})], people.join(ids, "id", "id").to_list()
+        )
+        self.assertListEqual([1, 2, 3], people.union(ids, "id").select("id").to_list())
+        # union keeps the order of the unsorted union instead of merging by key
+        self.assertListEqual(
+            [{"id": 1}, {"id": 3}, {"id": 2}], ids.union(people, "id").to_list()
+        )
+        # other keys, directions or a budget fall back to the general operators
+        self.assertNotIsInstance(
+            people.join(ids, "id", lambda x: x["id"]), MergeJoinEnumerable
+        )
+        self.assertNotIsInstance(
+            people.join(Enumerable([{"id": 1}]).assume_sorted("id", True), "id", "id"),
+            MergeJoinEnumerable,
+        )
+        self.assertIsInstance(
+            people.join(ids, "id", "id", max_in_memory=10), JoinEnumerable
+        )
+        self.assertIsInstance(
+            people.where(lambda p: p["id"] > 1).intersect(ids, "id"),
+            MergeIntersectEnumerable,
+        )
+
+    def test_merge_join_streams(self):
+        outer = Enumerable(itertools.count()).assume_sorted()
+        inner = Enumerable(itertools.count(0, 3)).assume_sorted()
+        self.assertListEqual(
+            [(0, 0), (3, 3), (6, 6)], outer.join(inner).take(3).to_list()
+        )
+
+    def test_contains_min_max(self):
+        data = Enumerable(list(range(0, 100, 2))).assume_sorted()
+        self.assertTrue(data.contains(42))
+        self.assertFalse(data.contains(43))
+        self.assertFalse(data.contains(-1))
+        self.assertFalse(data.contains(100))
+        self.assertEqual(0, data.min())
+        self.assertEqual(98, data.max())
+        descending = Enumerable([5, 3, 1]).assume_sorted(descending=True)
+        self.assertTrue(descending.contains(3))
+        self.assertFalse(descending.contains(2))
+        self.assertEqual(1, descending.min())
+        self.assertEqual(5, descending.max())
+        self.assertEqual(3, descending.where(lambda x: x < 4).max())
+        people = Enumerable([{"id": 2}, {"id": 1}]).order_by_descending("id")
+        self.assertTrue(people.contains({"id": 1}, "id"))
+        self.assertEqual(2, people.max("id"))
+        self.assertEqual(1, people.min("id"))
+
+    def test_min_max_read_ends(self):
+        reads = []
+
+        def read(x):
+            reads.append(x)
+            return x
+
+        data = Enumerable(range(100000)).select(read).assume_sorted()
+        self.assertEqual(0, data.min())
+        self.assertEqual(1, len(reads))
+        del reads[:]
+        self.assertEqual(99999, data.max())
+        self.assertEqual(100000, len(reads))
+
+        class Items(list):
+            def __iter__(self):
+                reads.append(None)
+                return super(Items, self).__iter__()
+
+        items = Enumerable(Items(range(100000))).assume_sorted()
+        del reads[:]
+        self.assertEqual(0, items.min())
+        self.assertEqual(99999, items.max())
+        self.assertListEqual([], reads)
+        empty = Enumerable([]).assume_sorted()
+        self.assertRaises(NoElementsError, empty.min)
+        self.assertRaises(NoElementsError, empty.max)
+        self.assertRaises(NoElementsError, Enumerable(iter([])).assume_sorted().max)
+
+    def test_merge_sorted(self):
+        self.assertListEqual([], Enumerable.merge_sorted().to_list())
+        self.assertListEqual(
+            [1, 1, 2, 3, 4, 5],
+            Enumerable.merge_sorted(
+                Enumerable([1, 3, 5]), [1, 2], Enumerable([4])
+            ).to_list(),
+        )
+        self.assertListEqual(
+            [("b", 3), ("a", 2), ("c", 2), ("a", 1)],
+            Enumerable.merge_sorted(
+                [("b", 3), ("a", 2)],
+                [("c", 2), ("a", 1)],
+                key="1",
+                descending=True,
+            ).to_list(),
+        )
+        merged = Enumerable.merge_sorted(
+            Enumerable(itertools.count(0, 2)), Enumerable(itertools.count(1, 2))
+        )
+        self.assertListEqual([0, 1, 2, 3, 4], merged.take(5).to_list())
+        self.assertEqual(
+            5, Enumerable.merge_sorted([1, 2], [3, 4, 5]).assume_sorted().max()
+        )
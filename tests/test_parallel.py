@@ -0,0 +1,129 @@
+from unittest import TestCase
+from py_linq import Enumerable
+from py_linq.aggregates import Count, Sum
+from py_linq.exceptions import NoElementsError
+from py_linq.parallel import PartitionedJob
+from py_linq.py_linq import PartitionedEnumerable
+from tests import _locations
+
+
+class TestParallel(TestCase):
+    def setUp(self):
+        self.locations = Enumerable(_locations)
+        self.partitioned = self.locations.partitioned(3)
+
+    def test_group_by(self):
+        def summary(g):
+            return (g.key.country, g.count())
+
+        expected = self.locations.group_by(["country"], lambda loc: [loc[0]], summary)
+        result = self.partitioned.group_by(["country"], lambda loc: [loc[0]], summary)
+        self.assertListEqual(sorted(expected.to_list()), sorted(result.to_list()))
+        self.assertListEqual(result.to_list(), result.to_list())
+
+    def test_aggregate_by(self):
+        result = self.partitioned.aggregate_by(
+            ["country", "city"],
+            lambda loc: loc[:2],
+            lambda g: (g.key.country, g.key.city, g.count, g.total),
+            count=Count(),
+            total=Sum(lambda loc: loc[3]),
+        ).to_list()
+        self.assertEqual(7, len(result))
+        self.assertIn(("England", "London", 3, 240000), result)
+        self.assertRaises(TypeError, self.partitioned.aggregate_by, count=len)
+
+    def test_distinct_and_set_operations(self):
+        numbers = Enumerable([5, 1, 2, 2, 3, 1, 4]).partitioned(2)
+        self.assertListEqual([1, 2, 3, 4, 5], sorted(numbers.distinct().to_list()))
+        self.assertListEqual(
+            [1, 2, 3, 4, 5, 6, 7],
+            sorted(numbers.union(Enumerable([6, 7, 5])).to_list()),
+        )
+        self.assertListEqual(
+            [2, 2, 3], sorted(numbers.intersect(Enumerable([2, 3, 9])).to_list())
+        )
+        self.assertListEqual(
+            [1, 1, 4, 5], sorted(numbers.except_(Enumerable([2, 3])).to_list())
+        )
+        self.assertRaises(TypeError, numbers.union, [1])
+
+    def test_approx_aggregates(self):
+        numbers = Enumerable.range(0, 20000).select(lambda x: x % 7000)
+        partitioned = numbers.partitioned(3)
+        self.assertEqual(
+            numbers.approx_count_distinct(), partitioned.approx_count_distinct()
+        )
+        self.assertEqual(
+            numbers.approx_count_distinct(lambda x: x % 10),
+            partitioned.approx_count_distinct(lambda x: x % 10),
+        )
+        self.assertEqual(
+            2, self.partitioned.approx_quantile(0.5, lambda loc: loc[3] // 10000)
+        )
+        self.assertAlmostEqual(
+            3333, partitioned.approx_quantile(0.5, seed=1), delta=20000 * 0.02
+        )
+        self.assertRaises(
+            NoElementsError, Enumerable().partitioned(2).approx_quantile, 0.5
+        )
+        self.assertRaises(ValueError, partitioned.approx_quantile, 2)
+
+    def test_streaming_operators_stay_partitioned(self):
+        query = (
+            self.partitioned.where(lambda loc: loc[3] > 40000)
+            .select(lambda loc: loc[:2])
+            .select_many(lambda loc: [loc])
+        )
+        self.assertIsInstance(query, PartitionedEnumerable)
+        self.assertEqual(3, query.workers)
+        grouped = query.group_by(["country"], lambda loc: [loc[0]], lambda g: g.count())
+        self.assertIsInstance(grouped.data, PartitionedJob)
+        expected = (
+            self.locations.where(lambda loc: loc[3] > 40000)
+            .group_by(["country"], lambda loc: [loc[0]], lambda g: g.count())
+            .to_list()
+        )
+        self.assertListEqual([5], expected)
+        self.assertListEqual(expected, grouped.to_list())
+        self.assertNotIsInstance(self.partitioned.take(2), PartitionedEnumerable)
+
+    def test_join(self):
+        countries = Enumerable([("England", "EN"), ("Wales", "WA"), ("France", "FR")])
+        expected = self.locations.join(
+            countries, lambda loc: loc[0], lambda c: c[0], lambda r: (r[1][1], r[0][2])
+        )
+        result = self.partitioned.join(
+            countries, lambda loc: loc[0], lambda c: c[0], lambda r: (r[1][1], r[0][2])
+        )
+        self.assertListEqual(sorted(expected.to_list()), sorted(result.to_list()))
+        grouped = self.partitioned.group_join(
+            countries,
+            lambda loc: loc[0],
+            lambda c: c[0],
+            lambda r: (r[0][1], r[1].count()),
+        ).to_list()
+        self.assertEqual(13, len(grouped))
+        self.assertIn(("Edinburgh", 0), grouped)
+        self.assertIn(("Bangor", 1), grouped)
+
+    def test_worker_errors(self):
+        test = Enumerable([1, 2, 0]).partitioned(2)
+        self.assertRaises(
+            ZeroDivisionError,
+            test.group_by(["inverse"], lambda x: 1 / x).to_list,
+        )
+        self.assertRaises(
+            ZeroDivisionError,
+            test.group_by(["x"], lambda x: x, lambda g: 1 / g.key.x).to_list,
+        )
+        self.assertRaises(ValueError, Enumerable().partitioned, 0)
+
+    def test_partial_iteration(self):
+        test = Enumerable(range(100)).partitioned(4).distinct()
+        self.assertEqual(1, len(test.take(1).to_list()))
+        self.assertListEqual(list(range(100)), sorted(test.to_list()))
+
+    def test_default_workers(self):
+        test = Enumerable([1, 2, 3]).partitioned()
+        self.assertListEqual([1, 2, 3], sorted(test.distinct().to_list()))
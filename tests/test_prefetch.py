@@ -0,0 +1,85 @@
+import threading
+import time
+from unittest import TestCase
+from py_linq import Enumerable
+from tests import _empty, _locations
+
+
+class Source(object):
+    """
+    Re-iterable source that records whether its iterators were closed
+    """
+
+    def __init__(self, n, delay=0.0, fail_at=None):
+        self.n = n
+        self.delay = delay
+        self.fail_at = fail_at
+        self.read = 0
+        self.closed = 0
+
+    def __iter__(self):
+        try:
+            for i in range(self.n):
+                if i == self.fail_at:
+                    raise KeyError(i)
+                time.sleep(self.delay)
+                self.read += 1
+                yield i
+        finally:
+            self.closed += 1
+
+
+class TestPrefetch(TestCase):
+    def setUp(self):
+        self.threads = threading.active_count()
+
+    def tearDown(self):
+        self.assertEqual(self.threads, threading.active_count())
+
+    def test_prefetch(self):
+        self.assertEqual([], Enumerable(_empty).prefetch().to_list())
+        self.assertEqual(_locations, Enumerable(_locations).prefetch(1).to_list())
+        query = Enumerable.range(0, 10000).prefetch(64).where(lambda x: x % 3 == 0)
+        self.assertEqual(list(range(0, 10000, 3)), query.to_list())
+        self.assertEqual(query.to_list(), query.to_list())
+        self.assertRaises(ValueError, Enumerable(_empty).prefetch, 0)
+
+    def test_overlap(self):
+        def work(x):
+            time.sleep(0.005)
+            return x
+
+        start = time.time()
+        result = Enumerable(Source(40, delay=0.005)).prefetch(8).select(work)
+        self.assertEqual(list(range(40)), result.to_list())
+        self.assertLess(time.time() - start, 40 * 0.01)
+
+    def test_stalling_source(self):
+        def stall():
+            yield 1
+            yield 2
+            time.sleep(0.5)
+            yield 3
+
+        source = Enumerable([0]).select_many(lambda x: stall())
+        start = time.time()
+        iterator = iter(source.prefetch(100))
+        self.assertEqual([1, 2], [next(iterator), next(iterator)])
+        self.assertLess(time.time() - start, 0.25)
+        self.assertEqual([3], list(iterator))
+
+    def test_exception(self):
+        source = Source(100, fail_at=50)
+        iterator = iter(Enumerable(source).prefetch(10))
+        self.assertEqual(list(range(50)), [next(iterator) for i in range(50)])
+        self.assertRaises(KeyError, next, iterator)
+        self.assertEqual(1, source.closed)
+
+    def test_early_termination(self):
+        source = Source(100000)
+        self.assertEqual([0, 1, 2], Enumerable(source).prefetch(16).take(3).to_list())
+        iterator = iter(Enumerable(source).prefetch(16))
+        self.assertEqual(0, next(iterator))
+        iterator.close()
+        self.assertEqual(2, source.closed)
+        self.assertLess(source.read, 1000)
@@ -0,0 +1,82 @@
+import os
+import shutil
+import struct
+import tempfile
+from unittest import TestCase
+from py_linq import Enumerable
+from py_linq.records import RecordBuffer, parse_format
+
+
+class TestRecords(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.format = "<Idh"
+        self.rows = [(i, i * 0.5, -i) for i in range(100)]
+        self.path = os.path.join(self.directory, "records.bin")
+        with open(self.path, "wb") as f:
+            for row in self.rows:
+                f.write(struct.pack(self.format, *row))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parse_format(self):
+        self.assertEqual([("I", 0), ("d", 4), ("h", 12)], parse_format("<Idh"))
+        self.assertEqual(
+            [("i", 0), ("i", 4), ("s", 9), ("d", 16)], parse_format("@2ix3sd")
+        )
+
+    def test_from_struct_file(self):
+        records = Enumerable.from_struct_file(
+            self.path, self.format, ["id", "value", "delta"]
+        )
+        self.assertEqual(100, records.count())
+        self.assertEqual(100, len(records))
+        self.assertEqual(self.rows, [tuple(r) for r in records])
+        self.assertEqual(49.5, records.element_at(99).value)
+        self.assertRaises(IndexError, records.element_at, 100)
+        self.assertIsNone(records.element_at_or_default(100))
+        self.assertEqual(
+            self.rows[10:15], records.skip(10).take(5).select(tuple).to_list()
+        )
+        self.assertEqual(0, records.skip(200).count())
+        self.assertEqual(0, records.take(-1).count())
+        self.assertEqual(100, records.skip(-1).count())
+        self.assertEqual(
+            sum(i for i in range(100) if i % 2),
+            records.where(lambda r: r.id % 2).sum("id"),
+        )
+
+    def test_empty_file(self):
+        path = os.path.join(self.directory, "empty.bin")
+        open(path, "wb").close()
+        self.assertEqual([], Enumerable.from_struct_file(path, "<i").to_list())
+
+    def test_from_buffer(self):
+        buffer = bytearray(struct.pack("<3i", 1, 2, 3))
+        records = Enumerable.from_buffer(buffer, "<i")
+        self.assertEqual([(1,), (2,), (3,)], records.to_list())
+        buffer[0:4] = struct.pack("<i", 7)
+        self.assertEqual((7,), records.first())
+        self.assertRaises(ValueError, Enumerable.from_buffer, b"\x00" * 5, "<i")
+        self.assertRaises(ValueError, Enumerable.from_buffer, buffer, "<i", ["a", "b"])
+
+    def test_column(self):
+        native = bytearray()
+        for row in self.rows:
+            native += struct.pack("=qd", row[0], row[1])
+        records = Enumerable.from_buffer(native, "=qd", ["id", "value"])
+        ids = records.column("id")
+        self.assertIsInstance(ids, memoryview)
+        self.assertEqual(list(range(100)), ids.tolist())
+        values = records.skip(10).take(3).column(1)
+        self.assertEqual([5.0, 5.5, 6.0], values.tolist())
+        unprefixed = Enumerable.from_buffer(bytes(native), "qd").column(0)
+        self.assertIsInstance(unprefixed, memoryview)
+        self.assertEqual(list(range(100)), unprefixed.tolist())
+        # unaligned fields are unpacked instead
+        packed = RecordBuffer(struct.pack("=bq", 1, 2) * 3, "=bq")
+        self.assertEqual([2, 2, 2], list(packed.column(1)))
+        swapped = ">" if struct.pack("=h", 1) == struct.pack("<h", 1) else "<"
+        other = RecordBuffer(struct.pack(swapped + "h", 5), swapped + "h")
+        self.assertEqual([5], other.column(0))
@@ -0,0 +1,91 @@
+import itertools
+import random
+from unittest import TestCase
+from py_linq import Enumerable
+from py_linq.core import stable_hash
+from py_linq.exceptions import NoElementsError
+from py_linq.sketches import HyperLogLog, QuantileSketch
+from tests import _empty, _simple
+
+
+class TestSketches(TestCase):
+    def test_approx_count_distinct(self):
+        self.assertEqual(0, Enumerable(_empty).approx_count_distinct())
+        self.assertEqual(3, Enumerable(_simple * 5).approx_count_distinct())
+        estimate = Enumerable.range(0, 100000).approx_count_distinct(
+            lambda x: x % 50000
+        )
+        self.assertAlmostEqual(50000, estimate, delta=50000 * 0.05)
+
+    def test_stable_hash(self):
+        # the same on every run, so partitions and sketches are reproducible
+        self.assertEqual(16294208416658607535, stable_hash(0))
+        self.assertEqual(10376663631224000432, stable_hash("abc"))
+        self.assertEqual(stable_hash("abc"), stable_hash(b"abc"))
+        self.assertEqual(2552501147715352600, stable_hash([1, "a"]))
+        self.assertNotEqual(stable_hash(1), stable_hash(True))
+        hashes = [stable_hash(i) for i in range(-5000, 5000)]
+        self.assertEqual(10000, len(set(hashes)))
+        self.assertTrue(all(0 <= h < 1 << 64 for h in hashes))
+        self.assertTrue(0 <= stable_hash(1 << 70) < 1 << 64)
+
+    def test_hyperloglog_merge(self):
+        left = HyperLogLog(12)
+        right = HyperLogLog(12)
+        whole = HyperLogLog(12)
+        for i in range(20000):
+            (left if i % 2 else right).add(i)
+            whole.add(i)
+        self.assertEqual(whole.count(), left.merge(right).count())
+        self.assertRaises(ValueError, left.merge, HyperLogLog(10))
+        self.assertRaises(ValueError, HyperLogLog, 3)
+
+    def test_approx_quantile(self):
+        self.assertRaises(NoElementsError, Enumerable(_empty).approx_quantile, 0.5)
+        self.assertRaises(ValueError, Enumerable(_simple).approx_quantile, 2)
+        self.assertEqual(2, Enumerable(_simple).approx_quantile(0.5))
+        data = list(range(100000))
+        random.Random(1).shuffle(data)
+        median = Enumerable(data).approx_quantile(0.5, seed=1)
+        self.assertAlmostEqual(50000, median, delta=100000 * 0.02)
+        p99 = Enumerable(data).select(lambda x: {"v": x}).approx_quantile(
+            0.99, lambda x: x["v"], seed=1
+        )
+        self.assertAlmostEqual(99000, p99, delta=100000 * 0.02)
+
+    def test_quantile_sketch_merge(self):
+        sketches = [QuantileSketch(seed=i) for i in range(4)]
+        for i in range(40000):
+            sketches[i % 4].add(i)
+        merged = sketches[0]
+        for sketch in sketches[1:]:
+            merged.merge(sketch)
+        self.assertEqual(40000, merged.n)
+        self.assertAlmostEqual(10000, merged.quantile(0.25), delta=40000 * 0.02)
+
+    def test_sample(self):
+        self.assertEqual([], Enumerable(_empty).sample(3).to_list())
+        self.assertEqual(_simple, Enumerable(_simple).sample(5).to_list())
+        self.assertEqual([], Enumerable(_simple).sample(0).to_list())
+        self.assertRaises(ValueError, Enumerable(_simple).sample, -1)
+        sample = Enumerable.range(0, 100000).sample(100, seed=7)
+        self.assertEqual(sample.to_list(), sample.to_list())
+        self.assertEqual(100, len(set(sample)))
+        self.assertEqual(sorted(sample), sample.to_list())
+        counts = [0] * 10
+        for seed in range(5000):
+            for element in Enumerable.range(0, 10).sample(3, seed=seed):
+                counts[element] += 1
+        for count in counts:
+            self.assertAlmostEqual(1500, count, delta=150)
+
+    def test_sample_fraction(self):
+        self.assertEqual([], Enumerable(_simple).sample_fraction(0).to_list())
+        self.assertEqual(_simple, Enumerable(_simple).sample_fraction(1).to_list())
+        self.assertRaises(ValueError, Enumerable(_simple).sample_fraction, 1.5)
+        sample = Enumerable.range(0, 100000).sample_fraction(0.1, seed=3)
+        self.assertEqual(sample.to_list(), sample.to_list())
+        self.assertAlmostEqual(10000, sample.count(), delta=500)
+        self.assertEqual(sorted(sample), sample.to_list())
+        infinite = Enumerable(itertools.count()).sample_fraction(0.5, seed=1)
+        self.assertEqual(5, len(infinite.take(5).to_list()))